@@ -0,0 +1,413 @@
+"""
+Cold-storage tiering for old evidence.
+
+``archive_evidence`` moves the heavy part of each record older than
+``ARCHIVE_AFTER_DAYS`` into an archive segment. That means its detection
+result, C2PA manifest, Merkle leaf list and PDF certificate. The hot
+``evidence`` row is left as a stub. The stub keeps every column that
+listings, filters, search, stats and verification read, and
+``archive_segment`` names the segment that holds the rest.
+
+A segment is a sequence of independent zstd frames: one per archived row
+(the full row as JSON) and one per PDF. It ends with a manifest frame
+listing every member's offset, length and SHA-256, and a 24-byte trailer
+(a zstd skippable frame) pointing at the manifest. The file is named by
+the SHA-256 of its contents, so it is immutable and self-verifying, and
+any one member can be read with a single seek. The ``archive_index`` table
+maps evidence ids to their members.
+
+Reads are transparent. ``get_evidence`` and the PDF download call
+``rehydrate``, which writes the archived columns back into the hot row and
+restores the PDF. List views overlay archived columns with
+``read_archived_rows`` without thawing the page. A rehydrated record is
+not archived again for another ``ARCHIVE_AFTER_DAYS``.
+
+Triggers that maintain side tables from ``detection_result`` skip the
+archival update, so archived records keep their ``detection_scores`` rows,
+full-text entries and stats.
+"""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+import group_commit
+from sqlite_pool import get_connection as _conn
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(tempfile.gettempdir(), "trustchain_archive"))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+SEGMENT_MAX_RECORDS = int(os.getenv("ARCHIVE_SEGMENT_MAX_RECORDS", "1000"))
+ZSTD_LEVEL = int(os.getenv("ARCHIVE_ZSTD_LEVEL", "10"))
+
+# Columns moved out of the hot row; everything else stays in the stub
+ARCHIVED_COLUMNS = ("detection_result", "c2pa_manifest", "merkle_leaves", "pdf_path")
+
+_FORMAT = 1
+_TRAILER_MAGIC = b"TCARCH01"
+# Skippable frame magic (0x184D2A50-0x184D2A5F) with a 16-byte payload:
+# manifest offset (uint64) + _TRAILER_MAGIC. Decoders ignore it, so the
+# whole segment is still a valid zstd stream.
+_TRAILER = struct.Struct("<IIQ8s")
+_SKIPPABLE_MAGIC = 0x184D2A5E
+
+
+class ArchiveError(Exception):
+    """A segment is missing, unreadable or fails its checksums."""
+
+
+def _require_zstd() -> None:
+    if not HAS_ZSTD:
+        raise ArchiveError("zstandard is not installed; cold storage is unavailable")
+
+
+def init_archive_index() -> None:
+    """Create the table mapping archived evidence to segment members."""
+    with _conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive_index (
+                evidence_id TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                row_offset INTEGER NOT NULL,
+                row_length INTEGER NOT NULL,
+                pdf_offset INTEGER,
+                pdf_length INTEGER,
+                archived_at TEXT NOT NULL,
+                PRIMARY KEY (evidence_id, segment)
+            ) WITHOUT ROWID
+        """)
+        conn.commit()
+
+
+def _segment_path(segment: str) -> str:
+    return os.path.join(ARCHIVE_DIR, segment[:2], f"{segment}.zst")
+
+
+# ── Segment format ──
+
+def _write_segment(members: list[tuple[str, bytes, bytes | None]]) -> tuple[str, list[dict]]:
+    """
+    Write ``(evidence_id, row_json, pdf_bytes)`` members to a new segment.
+    Returns the segment hash and the manifest entry of each member.
+    """
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, write_checksum=True)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    entries = []
+    fd, tmp_path = tempfile.mkstemp(dir=ARCHIVE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            offset = 0
+
+            def put(data: bytes) -> list:
+                nonlocal offset
+                frame = compressor.compress(data)
+                out.write(frame)
+                digest.update(frame)
+                span = [offset, len(frame), hashlib.sha256(data).hexdigest()]
+                offset += len(frame)
+                return span
+
+            for evidence_id, row_json, pdf in members:
+                entries.append({
+                    "evidence_id": evidence_id,
+                    "row": put(row_json),
+                    "pdf": put(pdf) if pdf is not None else None,
+                })
+            manifest_offset = offset
+            put(json.dumps({
+                "format": _FORMAT,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "members": entries,
+            }).encode())
+            trailer = _TRAILER.pack(_SKIPPABLE_MAGIC, 16, manifest_offset, _TRAILER_MAGIC)
+            out.write(trailer)
+            digest.update(trailer)
+            out.flush()
+            os.fsync(out.fileno())
+        segment = digest.hexdigest()
+        path = _segment_path(segment)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return segment, entries
+
+
+def _read_frame(f, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    frame = f.read(length)
+    if len(frame) != length:
+        raise ArchiveError(f"truncated member at offset {offset}")
+    try:
+        return zstandard.ZstdDecompressor().decompress(frame)
+    except zstandard.ZstdError as e:
+        raise ArchiveError(f"corrupt member at offset {offset}: {e}") from e
+
+
+def _read_manifest(f) -> dict:
+    f.seek(-_TRAILER.size, os.SEEK_END)
+    magic, size, manifest_offset, tag = _TRAILER.unpack(f.read(_TRAILER.size))
+    if magic != _SKIPPABLE_MAGIC or size != 16 or tag != _TRAILER_MAGIC:
+        raise ArchiveError("not a TrustChain archive segment")
+    manifest_length = f.seek(0, os.SEEK_END) - _TRAILER.size - manifest_offset
+    return json.loads(_read_frame(f, manifest_offset, manifest_length))
+
+
+def _open_segment(segment: str):
+    try:
+        return open(_segment_path(segment), "rb")
+    except FileNotFoundError:
+        raise ArchiveError(f"segment {segment} is missing") from None
+
+
+# ── Archival ──
+
+_ELIGIBLE = """
+    FROM evidence
+    WHERE created_at < :cutoff AND archive_segment IS NULL
+      AND (rehydrated_at IS NULL OR rehydrated_at < :cutoff)
+"""
+
+
+def _read_pdf(path: str | None) -> bytes | None:
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def archive_evidence(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    max_records: int | None = None,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Move records created more than ``older_than_days`` ago into new
+    segments, ``SEGMENT_MAX_RECORDS`` at a time. Returns counts of records,
+    segments, bytes archived and PDF bytes freed.
+    """
+    _require_zstd()
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+    summary = {"records": 0, "segments": 0, "segment_bytes": 0, "pdf_bytes_freed": 0}
+    conn = _conn()
+    if dry_run:
+        (eligible,) = conn.execute(f"SELECT COUNT(*) {_ELIGIBLE}", {"cutoff": cutoff}).fetchone()
+        summary["records"] = eligible if max_records is None else min(eligible, max_records)
+        return summary
+    while max_records is None or summary["records"] < max_records:
+        batch_size = SEGMENT_MAX_RECORDS
+        if max_records is not None:
+            batch_size = min(batch_size, max_records - summary["records"])
+        rows = conn.execute(
+            f"SELECT * {_ELIGIBLE} ORDER BY created_at, id LIMIT :limit",
+            {"cutoff": cutoff, "limit": batch_size},
+        ).fetchall()
+        if not rows:
+            break
+
+        members = [
+            (row["id"], json.dumps(dict(row)).encode(), _read_pdf(row["pdf_path"]))
+            for row in rows
+        ]
+        segment, entries = _write_segment(members)
+        archived_at = datetime.now(timezone.utc).isoformat()
+        stubbed = []
+        with conn:
+            for row, entry in zip(rows, entries):
+                # Only stub the row if it has not been re-saved since it was read
+                cur = conn.execute(
+                    f"""
+                    UPDATE evidence SET {", ".join(f"{c} = NULL" for c in ARCHIVED_COLUMNS)},
+                        archive_segment = ?
+                    WHERE id = ? AND archive_segment IS NULL
+                      AND {" AND ".join(f"{c} IS ?" for c in ARCHIVED_COLUMNS)}
+                    """,
+                    (segment, row["id"], *(row[c] for c in ARCHIVED_COLUMNS)),
+                )
+                if cur.rowcount != 1:
+                    continue
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO archive_index
+                        (evidence_id, segment, row_offset, row_length,
+                         pdf_offset, pdf_length, archived_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (row["id"], segment, entry["row"][0], entry["row"][1],
+                     *(entry["pdf"][:2] if entry["pdf"] else (None, None)), archived_at),
+                )
+                stubbed.append(row)
+
+        if not stubbed:
+            break
+        # PDFs are removed only once their stubs have committed
+        for row in stubbed:
+            if row["pdf_path"] and os.path.exists(row["pdf_path"]):
+                summary["pdf_bytes_freed"] += os.path.getsize(row["pdf_path"])
+                os.remove(row["pdf_path"])
+        summary["records"] += len(stubbed)
+        summary["segments"] += 1
+        summary["segment_bytes"] += os.path.getsize(_segment_path(segment))
+        print(f"[Archive] Segment {segment[:12]}… holds {len(stubbed)} records")
+        if len(rows) < batch_size:
+            break
+    return summary
+
+
+# ── Reads ──
+
+def _member(conn, evidence_id: str, segment: str):
+    return conn.execute(
+        "SELECT * FROM archive_index WHERE evidence_id = ? AND segment = ?",
+        (evidence_id, segment),
+    ).fetchone()
+
+
+def read_archived_rows(stubs: list[tuple[str, str]]) -> dict[str, dict]:
+    """
+    The archived rows for ``(evidence_id, segment)`` pairs, keyed by
+    evidence id, opening each segment once. PDFs are not read.
+    """
+    _require_zstd()
+    by_segment: dict[str, list[str]] = {}
+    for evidence_id, segment in stubs:
+        by_segment.setdefault(segment, []).append(evidence_id)
+    rows = {}
+    conn = _conn()
+    for segment, ids in by_segment.items():
+        with _open_segment(segment) as f:
+            for evidence_id in ids:
+                member = _member(conn, evidence_id, segment)
+                if member is None:
+                    raise ArchiveError(f"{evidence_id} is not indexed in segment {segment}")
+                rows[evidence_id] = json.loads(
+                    _read_frame(f, member["row_offset"], member["row_length"])
+                )
+    return rows
+
+
+def rehydrate(evidence_id: str, segment: str) -> None:
+    """
+    Copy an archived record's columns and PDF back into the hot tier. A
+    no-op if the row was re-saved or rehydrated in the meantime.
+    """
+    _require_zstd()
+    member = _member(_conn(), evidence_id, segment)
+    if member is None:
+        raise ArchiveError(f"{evidence_id} is not indexed in segment {segment}")
+    with _open_segment(segment) as f:
+        row = json.loads(_read_frame(f, member["row_offset"], member["row_length"]))
+        pdf_path = row.get("pdf_path")
+        if pdf_path and member["pdf_offset"] is not None and not os.path.exists(pdf_path):
+            pdf = _read_frame(f, member["pdf_offset"], member["pdf_length"])
+            os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+            tmp_path = f"{pdf_path}.{os.getpid()}.part"
+            with open(tmp_path, "wb") as out:
+                out.write(pdf)
+            os.replace(tmp_path, pdf_path)
+    group_commit.write(
+        f"""
+        UPDATE evidence SET {", ".join(f"{c} = ?" for c in ARCHIVED_COLUMNS)},
+            archive_segment = NULL, rehydrated_at = ?
+        WHERE id = ? AND archive_segment = ?
+        """,
+        (*(row.get(c) for c in ARCHIVED_COLUMNS),
+         datetime.now(timezone.utc).isoformat(), evidence_id, segment),
+    )
+    print(f"[Archive] Rehydrated {evidence_id} from segment {segment[:12]}…")
+
+
+# ── Verification ──
+
+def verify_archive() -> dict:
+    """
+    Check every segment against its name and member checksums, every index
+    entry against its segment's manifest, and every stub against the index.
+    Returns counts and a list of problems (empty when everything checks out).
+    """
+    _require_zstd()
+    problems: list[str] = []
+    manifests: dict[str, dict] = {}
+    segments = members = 0
+    if os.path.isdir(ARCHIVE_DIR):
+        for root, _, files in os.walk(ARCHIVE_DIR):
+            for name in sorted(files):
+                if not name.endswith(".zst"):
+                    continue
+                segment = name[:-len(".zst")]
+                segments += 1
+                path = os.path.join(root, name)
+                digest = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+                    if digest.hexdigest() != segment:
+                        problems.append(f"segment {segment}: contents do not match its name")
+                        continue
+                    try:
+                        manifest = _read_manifest(f)
+                        for entry in manifest["members"]:
+                            for part in ("row", "pdf"):
+                                if entry[part] is None:
+                                    continue
+                                offset, length, sha = entry[part]
+                                if hashlib.sha256(_read_frame(f, offset, length)).hexdigest() != sha:
+                                    problems.append(
+                                        f"segment {segment}: {part} of {entry['evidence_id']} "
+                                        "fails its checksum"
+                                    )
+                            members += 1
+                    except (ArchiveError, ValueError, KeyError, struct.error) as e:
+                        problems.append(f"segment {segment}: {e}")
+                        continue
+                manifests[segment] = {e["evidence_id"]: e for e in manifest["members"]}
+
+    conn = _conn()
+    indexed = 0
+    for member in conn.execute("SELECT * FROM archive_index"):
+        indexed += 1
+        if member["segment"] not in manifests:
+            problems.append(
+                f"index: {member['evidence_id']} points at {member['segment']}, "
+                "which is missing or unreadable"
+            )
+            continue
+        entry = manifests[member["segment"]].get(member["evidence_id"])
+        if entry is None:
+            problems.append(
+                f"index: {member['evidence_id']} points at {member['segment']}, "
+                "which does not hold it"
+            )
+        elif entry["row"][:2] != [member["row_offset"], member["row_length"]]:
+            problems.append(f"index: {member['evidence_id']} has stale offsets")
+    stubs = 0
+    for stub in conn.execute(
+        """
+        SELECT e.id, e.archive_segment, a.evidence_id AS indexed FROM evidence AS e
+        LEFT JOIN archive_index AS a ON a.evidence_id = e.id AND a.segment = e.archive_segment
+        WHERE e.archive_segment IS NOT NULL
+        """
+    ):
+        stubs += 1
+        if stub["indexed"] is None:
+            problems.append(f"stub: {stub['id']} has no index entry in {stub['archive_segment']}")
+    return {
+        "segments": segments,
+        "members": members,
+        "indexed": indexed,
+        "stubs": stubs,
+        "problems": problems,
+    }
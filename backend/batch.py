@@ -0,0 +1,184 @@
+"""
+Batch ingest for bulk evidence seizures.
+
+Accepts any mix of media files and zip/tar archives. Archive entries are
+streamed out one at a time — zip members through ``ZipFile.open`` and tar
+members in streaming ``r|*`` mode — so an archive is never extracted as a
+whole. Each entry is hashed — kept in memory when small, spooled to disk
+otherwise — and handed to the regular evidence pipeline, with at most
+``parallelism`` entries in flight at once.
+"""
+import asyncio
+import os
+import tarfile
+import uuid
+import zipfile
+from typing import BinaryIO, Iterable, Iterator
+
+from hash_engine import spool_and_merkle_hash, spool_upload
+from pipeline import process_evidence, run_stage
+
+ARCHIVE_EXTS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "16"))
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTS)
+
+
+def _skip_entry(name: str) -> bool:
+    base = os.path.basename(name)
+    return not base or base.startswith(".") or name.startswith("__MACOSX/")
+
+
+def iter_archive_entries(fileobj: BinaryIO, filename: str) -> Iterator[tuple[str, BinaryIO]]:
+    """Yield ``(entry_name, stream)`` for each regular file in an archive."""
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or _skip_entry(info.filename):
+                    continue
+                with zf.open(info) as stream:
+                    yield info.filename, stream
+        return
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile() or _skip_entry(member.name):
+                continue
+            stream = tf.extractfile(member)
+            if stream is not None:
+                yield member.name, stream
+
+
+def iter_batch_entries(
+    uploads: Iterable[tuple[str, BinaryIO]],
+) -> Iterator[tuple[str, BinaryIO | Exception]]:
+    """
+    Flatten uploaded files and archives into a single stream of entries.
+
+    An archive that cannot be read yields ``(filename, exception)`` in place
+    of a stream, so one corrupt archive does not abort the rest of the batch.
+    """
+    for filename, fileobj in uploads:
+        if is_archive(filename):
+            try:
+                yield from iter_archive_entries(fileobj, filename)
+            except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+                yield filename, e
+        else:
+            yield filename, fileobj
+
+
+def _spool_next(entries: Iterator, spool_dir: str, merkle_mode: bool) -> dict | None:
+    """
+    Advance the entry stream by one and hash that entry. ``source`` is the
+    entry's bytes, or ``tmp_path`` when it was too large to keep in memory.
+    """
+    try:
+        name, stream = next(entries)
+    except StopIteration:
+        return None
+
+    event_id = str(uuid.uuid4())
+    ext = os.path.splitext(name)[1].lower()
+    tmp_path = os.path.join(spool_dir, f"{event_id}{ext}")
+    item = {"event_id": event_id, "filename": name, "tmp_path": tmp_path, "source": tmp_path}
+    if isinstance(stream, Exception):
+        item["error"] = f"Could not read archive: {type(stream).__name__}: {stream}"
+        return item
+    try:
+        if merkle_mode:
+            item["file_hash"], item["merkle"] = spool_and_merkle_hash(stream, tmp_path)
+        else:
+            item["file_hash"], item["source"] = spool_upload(stream, tmp_path)
+            item["merkle"] = None
+    except Exception as e:
+        item["error"] = f"{type(e).__name__}: {e}"
+    return item
+
+
+def _remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def _process_entry(index: int, item: dict, liability_ctx: dict) -> dict:
+    entry = {
+        "index": index,
+        "filename": item["filename"],
+        "file_hash": item.get("file_hash"),
+    }
+    try:
+        if "error" in item:
+            raise RuntimeError(item["error"])
+        result = await process_evidence(
+            item["event_id"],
+            item["filename"],
+            item["source"],
+            item["file_hash"],
+            liability_ctx,
+            merkle=item["merkle"],
+        )
+        entry.update({
+            "status": "processed",
+            "id": result["id"],
+            "detection_type": result["detection_type"],
+            "label": result["detection"]["label"],
+            "confidence": result["detection"]["confidence"],
+            "detection_cache_hit": result["detection_cache"].get("hit", False),
+            "blockchain_tx_id": result["blockchain"]["tx_id"],
+            "pdf_download_url": result["pdf_download_url"],
+        })
+    except Exception as e:
+        print(f"[Batch Ingest] {item['filename']} failed: {type(e).__name__}: {e}")
+        entry.update({"status": "failed", "error": str(e)})
+    finally:
+        await run_stage("io", _remove_file, item["tmp_path"])
+    return entry
+
+
+async def ingest_batch(
+    entries: Iterator[tuple[str, BinaryIO]],
+    liability_ctx: dict,
+    spool_dir: str,
+    parallelism: int = 4,
+    merkle_mode: bool = False,
+) -> list[dict]:
+    """
+    Pipeline every entry through hashing, detection, registration, PDF and
+    persistence, keeping at most ``parallelism`` entries in flight.
+
+    Returns the per-file result manifest in input order.
+    """
+    slots = asyncio.Semaphore(max(1, min(parallelism, MAX_PARALLELISM)))
+    tasks = []
+
+    async def run(index: int, item: dict) -> dict:
+        try:
+            return await _process_entry(index, item, liability_ctx)
+        finally:
+            slots.release()
+
+    while True:
+        # Reading the next entry waits for a free slot, so at most
+        # ``parallelism`` entries are held in memory or on disk at any time.
+        await slots.acquire()
+        try:
+            item = await run_stage("io", _spool_next, entries, spool_dir, merkle_mode)
+        except Exception as e:
+            # A corrupt archive ends the stream; entries already read still finish
+            slots.release()
+            archive_error = {
+                "index": len(tasks),
+                "filename": None,
+                "status": "failed",
+                "error": f"Could not read batch: {type(e).__name__}: {e}",
+            }
+            return list(await asyncio.gather(*tasks)) + [archive_error]
+        if item is None:
+            slots.release()
+            break
+        tasks.append(asyncio.create_task(run(len(tasks), item)))
+
+    return list(await asyncio.gather(*tasks))
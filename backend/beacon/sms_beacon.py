@@ -6,15 +6,18 @@ import random
 from datetime import datetime, timezone, timedelta
 
 
-def generate_beacon(evidence_id: str, file_hash: str) -> dict:
+def generate_beacon(
+    evidence_id: str, file_hash: str, captured_at: datetime | None = None
+) -> dict:
     """
-    Simulate sending a hash beacon via SMS.
+    Simulate sending a hash beacon via SMS at ``captured_at`` (defaults to now).
     Returns beacon reference, telecom timestamp, and cross-validation status.
     """
     rng = random.Random(evidence_id)
+    now = captured_at or datetime.now(timezone.utc)
 
     # Generate beacon reference (like VR-2026-XXXX)
-    year = datetime.now().year
+    year = now.year
     beacon_seq = rng.randint(1000, 9999)
     beacon_ref = f"AG-{year}-{beacon_seq}"
 
@@ -23,7 +26,6 @@ def generate_beacon(evidence_id: str, file_hash: str) -> dict:
 
     # Simulated SMS content
     station_code = f"STN{rng.randint(1, 999):03d}"
-    now = datetime.now(timezone.utc)
     sms_content = f"EVD|{station_code}|{now.strftime('%Y%m%d')}|{now.strftime('%H%M')}|{hash_prefix}"
 
     # Telecom timestamp (slightly offset from capture — simulates network delay)
@@ -0,0 +1,75 @@
+"""
+Benchmark: streaming STFT + bicoherence analysis time and peak memory by recording length.
+
+Recordings are synthetic voiced sound at 44.1 kHz (harmonics with drifting
+phase, pauses every 400 ms), written to a temporary WAV file a second at a
+time and analysed from disk the way a large upload is. Peak memory is the
+tracemalloc peak during the analysis, which includes NumPy buffers; it
+should not grow with the length of the recording.
+
+Usage:
+    python benchmarks/bench_audio_features.py --minutes 1 10 60
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from detection.audio_detector import analyze_audio  # noqa: E402
+from detection.audio_sampler import HAS_AV  # noqa: E402
+
+_RATE = 44100
+
+
+def _recording(path: str, minutes: float) -> None:
+    rng = np.random.default_rng(0)
+    t = np.arange(_RATE) / _RATE
+    harmonics = np.arange(1, 40)[:, None]
+    phase = rng.uniform(0, 2 * np.pi, size=(len(harmonics), 1))
+    with wave.open(path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(_RATE)
+        for _ in range(int(minutes * 60)):
+            f0 = rng.uniform(100, 180)
+            phase += rng.normal(0, 0.5, size=phase.shape)
+            voiced = (np.cos(2 * np.pi * f0 * harmonics * t + phase) / harmonics).sum(axis=0)
+            voiced *= np.sin(2 * np.pi * 2.5 * t) > -0.3
+            samples = 0.15 * voiced + rng.normal(0, 0.005, _RATE)
+            out.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60])
+    args = parser.parse_args()
+    if not HAS_AV:
+        sys.exit("PyAV is not installed")
+
+    print(f"{'length':>8} | {'time':>8} | {'per minute':>10} | {'peak memory':>11} | {'bicoherence':>11} | {'band limit':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for minutes in args.minutes:
+            path = os.path.join(tmp, f"recording_{minutes}.wav")
+            _recording(path, minutes)
+            tracemalloc.start()
+            start = time.perf_counter()
+            analysis = analyze_audio(path)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            os.remove(path)
+            print(
+                f"{minutes:6g}m | {elapsed:7.2f}s | {elapsed / minutes:9.2f}s | {peak / 2**20:8.1f} MB | "
+                f"{analysis['bicoherence']['confidence']:11.3f} | {analysis['spectral']['confidence']:10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark: GET /api/evidence/{id} latency under mixed read/write load,
+sync handlers on Starlette's threadpool vs async handlers awaiting the
+repository layer.
+
+Readers fetch random records back to back while writers post custody
+transfers at a steady rate. Every ``--stall-every`` seconds a maintenance
+transaction (standing in for ``archive``, ``rebuild-stats`` or a bulk
+import) holds the write lock for ``--stall-ms``, and writes pile up behind
+it. The "before" run mounts copies of the previous sync handlers under
+/legacy, where each waiting writer holds one of Starlette's threadpool
+threads until the pool runs dry and reads queue behind them, although WAL
+would let them proceed. The "after" run uses the app's own routes, where
+reads run on the DB pool and writers await their commit future.
+
+Usage:
+    python benchmarks/bench_db_latency.py --readers 16 --writers 64 --write-rate 400 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["REPORT_DIR"] = tempfile.mkdtemp()
+
+import httpx  # noqa: E402
+from fastapi import Form, HTTPException  # noqa: E402
+
+from custody.custody_manager import (  # noqa: E402
+    add_custody_event, get_custody_chain, init_custody_table,
+)
+import sqlite_pool  # noqa: E402
+from database import get_evidence, init_db, save_evidence  # noqa: E402
+from main import app, _reshape_record  # noqa: E402
+
+
+@app.get("/legacy/evidence/{id}")
+def _legacy_get_evidence(id: str):
+    record = get_evidence(id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    return _reshape_record(record, custody=get_custody_chain(id))
+
+
+@app.post("/legacy/custody/{evidence_id}/transfer")
+def _legacy_transfer_custody(
+    evidence_id: str,
+    custodian_name: str = Form(...),
+    custodian_role: str = Form(...),
+):
+    if get_evidence(evidence_id) is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    return add_custody_event(evidence_id, custodian_name, custodian_role)
+
+
+def _record(evidence_id: str) -> dict:
+    return {
+        "id": evidence_id,
+        "filename": "bench.jpg",
+        "file_hash": uuid.uuid4().hex * 2,
+        "timestamp": "2026-01-01T00:00:00+00:00",
+        "detection_type": "image",
+        "detection_confidence": 0.5,
+        "detection_result": {"confidence": 0.5, "explanation": "x" * 512},
+        "is_synthetic": False,
+        "liability_scores": {"platform": {"percentage": 40}},
+        "c2pa_manifest": {"instance_id": "urn:uuid:" + evidence_id},
+        "sms_beacon": {"status": "ANCHORED"},
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+async def _reader(client, prefix, ids, stop, latencies):
+    rng = random.Random()
+    while time.perf_counter() < stop:
+        started = time.perf_counter()
+        r = await client.get(f"{prefix}/evidence/{rng.choice(ids)}")
+        r.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _writer(client, prefix, ids, stop, pause, counter):
+    rng = random.Random()
+    form = {"custodian_name": "Bench", "custodian_role": "Forensic Analyst"}
+    while time.perf_counter() < stop:
+        r = await client.post(f"{prefix}/custody/{rng.choice(ids)}/transfer", data=form)
+        r.raise_for_status()
+        counter[0] += 1
+        await asyncio.sleep(pause * rng.uniform(0.5, 1.5))
+
+
+def _maintenance(stop: float, every: float, hold_ms: float) -> None:
+    conn = sqlite3.connect(sqlite_pool.DB_PATH, timeout=30, isolation_level=None)
+    while time.perf_counter() + every < stop:
+        time.sleep(every)
+        conn.execute("BEGIN IMMEDIATE")
+        time.sleep(hold_ms / 1000)
+        conn.execute("COMMIT")
+    conn.close()
+
+
+async def _run(prefix: str, ids: list[str], args) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    writes = [0]
+    pause = args.writers / args.write_rate
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = time.perf_counter() + args.seconds
+        stalls = threading.Thread(
+            target=_maintenance, args=(stop, args.stall_every, args.stall_ms), daemon=True
+        )
+        stalls.start()
+        await asyncio.gather(
+            *(_reader(client, prefix, ids, stop, latencies) for _ in range(args.readers)),
+            *(_writer(client, prefix, ids, stop, pause, writes) for _ in range(args.writers)),
+        )
+        stalls.join()
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "writes": writes[0],
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+    }
+
+
+def _report(label: str, result: dict, seconds: float) -> None:
+    print(f"{label:<18}: p50 {result['p50']:7.2f} ms, p99 {result['p99']:7.2f} ms, "
+          f"{result['reads'] / seconds:,.0f} reads/s, {result['writes'] / seconds:,.0f} writes/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--write-rate", type=float, default=400, help="target writes per second")
+    parser.add_argument("--stall-every", type=float, default=1.0, help="seconds between stalls")
+    parser.add_argument("--stall-ms", type=float, default=200, help="write-lock hold per stall")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    init_db()
+    init_custody_table()
+    ids = [str(uuid.uuid4()) for _ in range(args.seed_rows)]
+    for evidence_id in ids:
+        save_evidence(_record(evidence_id))
+        add_custody_event(evidence_id, "Seed", "Investigating Officer")
+
+    before = asyncio.run(_run("/legacy", ids, args))
+    after = asyncio.run(_run("/api", ids, args))
+
+    print(f"readers / writers : {args.readers} / {args.writers} for {args.seconds:g}s each")
+    print(f"write lock stalls : {args.stall_ms:g} ms every {args.stall_every:g}s")
+    _report("sync handlers", before, args.seconds)
+    _report("async repository", after, args.seconds)
+    print(f"p99 improvement   : {before['p99'] / after['p99']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: /api/health latency while slow uploads are in flight.
+
+Detection is replaced with a fixed blocking sleep that stands in for a slow
+Gemini call, so the numbers show whether the upload pipeline is keeping the
+event loop free for other requests.
+
+Usage:
+    python benchmarks/bench_event_loop.py --uploads 8 --detect-seconds 1.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import httpx  # noqa: E402
+
+import pipeline  # noqa: E402
+from main import app  # noqa: E402
+
+
+async def _upload(client: httpx.AsyncClient, i: int) -> None:
+    files = {"file": (f"bench_{i}.jpg", os.urandom(256 * 1024), "image/jpeg")}
+    r = await client.post("/api/upload", files=files)
+    r.raise_for_status()
+
+
+async def _probe_health(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def _run(uploads: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe_health(client, stop))
+        await asyncio.gather(*(_upload(client, i) for i in range(uploads)))
+        stop.set()
+        return await probe
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--detect-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    def _slow_detect(source, detection_type, file_hash, related, mime_type=None):
+        time.sleep(args.detect_seconds)
+        result = {"confidence": 0.5, "is_synthetic": False, "explanation": "benchmark"}
+        return result, {"hit": False}
+
+    pipeline._detect = _slow_detect
+
+    start = time.perf_counter()
+    latencies = asyncio.run(_run(args.uploads))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"uploads in flight : {args.uploads} x {args.detect_seconds:.1f}s detection")
+    print(f"wall time         : {elapsed:.2f}s")
+    print(f"health probes     : {len(latencies)}")
+    print(f"health p50 / p99  : {statistics.median(latencies):.1f} ms / {p99:.1f} ms")
+    print(f"health max        : {latencies[-1]:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: local FFT + ELA forensics time per image at common sizes.
+
+Images are synthetic 1/f noise (the spectrum of natural photographs),
+saved as JPEG and decoded in memory the way an upload arrives.
+
+Usage:
+    python benchmarks/bench_forensics.py --repeat 20
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from detection.forensics import analyze_image, ela_analysis, fft_analysis  # noqa: E402
+
+_SIZES = ((640, 480), (1280, 720), (1920, 1080), (4032, 3024))
+
+
+def _photo(width: int, height: int) -> bytes:
+    rng = np.random.default_rng(0)
+    f = np.hypot(np.fft.fftfreq(height)[:, None], np.fft.rfftfreq(width)[None, :])
+    f[0, 0] = 1.0
+    channels = []
+    for _ in range(3):
+        spectrum = (rng.normal(size=f.shape) + 1j * rng.normal(size=f.shape)) / f
+        c = np.fft.irfft2(spectrum, s=(height, width))
+        channels.append((c - c.mean()) / c.std() * 45 + 120)
+    pixels = np.clip(np.stack(channels, axis=-1), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _ms(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'size':>11} | {'fft':>8} | {'ela':>8} | {'decode + both':>13}")
+    for width, height in _SIZES:
+        data = _photo(width, height)
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            fft_ms = _ms(lambda: fft_analysis(img), args.repeat)
+            ela_ms = _ms(lambda: ela_analysis(img), args.repeat)
+        total_ms = _ms(lambda: analyze_image(data), args.repeat)
+        print(f"{width:>5}x{height:<5} | {fft_ms:6.1f}ms | {ela_ms:6.1f}ms | {total_ms:11.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: two-pass upload ingest (copy, then hash_file) vs single-pass
+spool_and_hash, plus spool_and_merkle_hash (flat hash + parallel leaves).
+
+Usage:
+    python benchmarks/bench_hash_engine.py --size-mb 512 --runs 3
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_engine import hash_file, spool_and_hash, spool_and_merkle_hash  # noqa: E402
+
+
+def _make_source(path: str, size_mb: int) -> None:
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def _two_pass(src_path: str, dest_path: str) -> str:
+    with open(src_path, "rb") as src, open(dest_path, "wb") as out:
+        shutil.copyfileobj(src, out)
+    return hash_file(dest_path)
+
+
+def _single_pass(src_path: str, dest_path: str) -> str:
+    with open(src_path, "rb") as src:
+        return spool_and_hash(src, dest_path)
+
+
+def _merkle(src_path: str, dest_path: str) -> str:
+    with open(src_path, "rb") as src:
+        return spool_and_merkle_hash(src, dest_path)[0]
+
+
+def _time(fn, src_path: str, dest_path: str, runs: int) -> tuple[float, str]:
+    best = float("inf")
+    digest = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        digest = fn(src_path, dest_path)
+        best = min(best, time.perf_counter() - start)
+        os.remove(dest_path)
+    return best, digest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src_path = os.path.join(tmp, "source.bin")
+        dest_path = os.path.join(tmp, "dest.bin")
+        _make_source(src_path, args.size_mb)
+
+        two_pass, h1 = _time(_two_pass, src_path, dest_path, args.runs)
+        single_pass, h2 = _time(_single_pass, src_path, dest_path, args.runs)
+        merkle, h3 = _time(_merkle, src_path, dest_path, args.runs)
+
+    assert h1 == h2 == h3, "digest mismatch between ingest paths"
+    rows = (
+        ("copy + hash_file", two_pass),
+        ("spool_and_hash", single_pass),
+        ("+ merkle leaves", merkle),
+    )
+    for name, secs in rows:
+        print(f"{name:>18}: {secs:.3f}s  ({args.size_mb / secs:,.0f} MB/s)")
+    print(f"{'speedup':>18}: {two_pass / single_pass:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
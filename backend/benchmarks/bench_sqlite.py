@@ -0,0 +1,149 @@
+"""
+Benchmark: evidence reads/writes per second from concurrent worker threads,
+opening a connection per call (rollback journal) vs the shared sqlite_pool
+layer (per-thread WAL connections with cached statements).
+
+Threads stand in for FastAPI's sync-endpoint threadpool and the pipeline's
+io pool; each one mixes get_evidence/get_custody_chain reads with
+save_evidence/add_custody_event writes.
+
+Usage:
+    python benchmarks/bench_sqlite.py --threads 16 --ops 2000 --write-ratio 0.1
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+import group_commit  # noqa: E402
+import sqlite_pool  # noqa: E402
+from custody.custody_manager import (  # noqa: E402
+    add_custody_event, get_custody_chain, init_custody_table,
+)
+from database import get_evidence, init_db, save_evidence  # noqa: E402
+
+
+def _record(evidence_id: str) -> dict:
+    return {
+        "id": evidence_id,
+        "filename": "bench.jpg",
+        "file_hash": uuid.uuid4().hex * 2,
+        "timestamp": "2026-01-01T00:00:00+00:00",
+        "detection_type": "image",
+        "detection_confidence": 0.5,
+        "detection_result": {"confidence": 0.5, "explanation": "x" * 512},
+        "is_synthetic": False,
+        "blockchain_tx_id": "0x" + uuid.uuid4().hex,
+        "liability_scores": {"platform": 40, "creator": 40, "model": 20},
+        "pdf_path": "/tmp/bench.pdf",
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+class _PerCallConnection:
+    """The previous behaviour: a fresh rollback-journal connection per call."""
+
+    def __enter__(self):
+        self.conn = sqlite3.connect(sqlite_pool.DB_PATH, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        try:
+            return self.conn.__exit__(*exc)
+        finally:
+            self.conn.close()
+
+
+def _use_per_call_connections() -> None:
+    import custody.custody_manager as custody
+    import database
+
+    for module in (database, custody, group_commit):
+        module._conn = _PerCallConnection
+    with sqlite3.connect(sqlite_pool.DB_PATH) as conn:
+        conn.execute("PRAGMA journal_mode = DELETE")
+
+
+def _use_pool() -> None:
+    import custody.custody_manager as custody
+    import database
+
+    for module in (database, custody, group_commit):
+        module._conn = sqlite_pool.get_connection
+
+
+def _worker(ids: list[str], ops: int, write_ratio: float, errors: list) -> None:
+    rng = random.Random()
+    try:
+        for _ in range(ops):
+            if rng.random() < write_ratio:
+                evidence_id = str(uuid.uuid4())
+                save_evidence(_record(evidence_id))
+                add_custody_event(evidence_id, "Bench", "Forensic Analyst")
+            else:
+                evidence_id = rng.choice(ids)
+                get_evidence(evidence_id)
+                get_custody_chain(evidence_id)
+        sqlite_pool.close_connection()
+    except Exception as e:
+        errors.append(e)
+
+
+def _run(threads: int, ops: int, write_ratio: float, ids: list[str]) -> float:
+    errors: list = []
+    workers = [
+        threading.Thread(target=_worker, args=(ids, ops, write_ratio, errors))
+        for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return threads * ops / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=2000, help="operations per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--seed-rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Compare connection handling alone; bench_group_commit.py covers batching
+    group_commit.ENABLED = False
+    init_db()
+    init_custody_table()
+    ids = [str(uuid.uuid4()) for _ in range(args.seed_rows)]
+    for evidence_id in ids:
+        save_evidence(_record(evidence_id))
+        add_custody_event(evidence_id, "Seed", "Investigating Officer")
+    sqlite_pool.close_connection()
+
+    _use_per_call_connections()
+    baseline = _run(args.threads, args.ops, args.write_ratio, ids)
+
+    _use_pool()
+    pooled = _run(args.threads, args.ops, args.write_ratio, ids)
+
+    print(f"threads / ops     : {args.threads} x {args.ops} ({args.write_ratio:.0%} writes)")
+    print(f"per-call connect  : {baseline:,.0f} ops/s")
+    print(f"sqlite_pool (WAL) : {pooled:,.0f} ops/s")
+    print(f"speedup           : {pooled / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,10 +14,22 @@ def _mock_tx_hash() -> str:
     return "0x" + secrets.token_hex(32)
 
 
-def register_evidence(file_hash: str, case_id: str, uploader: str) -> str:
-    """Register evidence on-chain; returns transaction hash."""
+def _registration(tx_id: str, status: str, block_timestamp: int | None = None) -> dict:
+    return {"tx_id": tx_id, "status": status, "block_timestamp": block_timestamp}
+
+
+def register_evidence(file_hash: str, case_id: str, uploader: str) -> dict:
+    """
+    Register evidence on-chain. Returns ``{"tx_id", "status", "block_timestamp"}``.
+
+    The transaction is sent without waiting for it to be mined, so ``status``
+    is ``pending`` and ``receipt_status(tx_id)`` tells how it ended. It is
+    ``failed`` when nothing could be sent (node unreachable or an error) and
+    ``mock`` when no chain is configured; those carry a placeholder ``tx_id``
+    and prove nothing about the hash.
+    """
     if _is_mock_mode():
-        return _mock_tx_hash()
+        return _registration(_mock_tx_hash(), "mock")
 
     try:
         from web3 import Web3
@@ -28,7 +40,7 @@ def register_evidence(file_hash: str, case_id: str, uploader: str) -> str:
 
         w3 = Web3(Web3.HTTPProvider(rpc_url))
         if not w3.is_connected():
-            return _mock_tx_hash()
+            return _registration(_mock_tx_hash(), "failed")
 
         abi = [
             {
@@ -56,9 +68,39 @@ def register_evidence(file_hash: str, case_id: str, uploader: str) -> str:
         })
         signed = account.sign_transaction(tx)
         tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
-        return tx_hash.hex()
+        return _registration(tx_hash.hex(), "pending")
+    except Exception:
+        return _registration(_mock_tx_hash(), "failed")
+
+
+def receipt_status(tx_id: str) -> tuple:
+    """
+    Look up a sent registration without waiting; returns (status, block_timestamp).
+
+    ``status`` is ``confirmed`` once the transaction is mined and succeeded,
+    with the timestamp of its block, ``failed`` if it reverted, and
+    ``pending`` while it is unmined or the node cannot be reached.
+    """
+    if _is_mock_mode():
+        return ("pending", None)
+
+    try:
+        from web3 import Web3
+        from web3.exceptions import TransactionNotFound
+
+        w3 = Web3(Web3.HTTPProvider(os.getenv("SEPOLIA_RPC_URL")))
+        if not w3.is_connected():
+            return ("pending", None)
+        try:
+            receipt = w3.eth.get_transaction_receipt(tx_id)
+        except TransactionNotFound:
+            return ("pending", None)
+        if receipt["status"] != 1:
+            return ("failed", None)
+        block = w3.eth.get_block(receipt["blockNumber"])
+        return ("confirmed", int(block["timestamp"]))
     except Exception:
-        return _mock_tx_hash()
+        return ("pending", None)
 
 
 def verify_evidence(file_hash: str) -> tuple:
@@ -0,0 +1,185 @@
+"""
+Local index of registered evidence hashes.
+
+A hash is recorded here only once the chain has vouched for it: either this
+instance's registration transaction was mined with a successful receipt
+(``source = 'receipt'``), or the contract answered positively
+(``source = 'chain'``). Mock, failed and still-pending registrations are
+never indexed. Verification is then an indexed SQLite lookup, and
+``contract.functions.verify`` is only called for hashes the index has not
+seen.
+
+Registrations are sent without waiting for a receipt. Sent transactions
+wait in ``pending_registrations`` until a background watcher sees them
+mined: a successful receipt moves the hash into the index, a reverted one
+is dropped, and one still unmined after ``CHAIN_PENDING_TTL_S`` is given up.
+"""
+import os
+import threading
+import time
+
+from blockchain.contract import receipt_status, verify_evidence
+from sqlite_pool import get_connection as _conn
+
+POLL_S = float(os.getenv("CHAIN_RECEIPT_POLL_S", "15"))
+PENDING_TTL_S = float(os.getenv("CHAIN_PENDING_TTL_S", "86400"))
+
+# SQLite's default limit on bound parameters is 999
+_LOOKUP_BATCH = 500
+# Receipts looked up per watcher pass
+_CONFIRM_BATCH = 100
+
+_watcher: threading.Thread | None = None
+_watcher_lock = threading.Lock()
+
+
+def init_registry_index() -> None:
+    with _conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chain_registrations (
+                file_hash TEXT PRIMARY KEY,
+                tx_id TEXT,
+                case_id TEXT,
+                block_timestamp INTEGER NOT NULL,
+                source TEXT NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_registrations (
+                tx_id TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                case_id TEXT,
+                submitted_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+
+
+def record_registration(
+    file_hash: str,
+    tx_id: str | None,
+    case_id: str,
+    block_timestamp: int,
+    source: str = "receipt",
+) -> None:
+    """Index a registration the chain has confirmed, stamped with its block time."""
+    with _conn() as conn:
+        # The earliest registration of a hash is the one that counts
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO chain_registrations
+                (file_hash, tx_id, case_id, block_timestamp, source)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (file_hash, tx_id, case_id, block_timestamp, source),
+        )
+        conn.commit()
+
+
+def record_pending(file_hash: str, tx_id: str, case_id: str) -> None:
+    """Queue a sent registration for the receipt watcher."""
+    with _conn() as conn:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO pending_registrations (tx_id, file_hash, case_id, submitted_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (tx_id, file_hash, case_id, time.time()),
+        )
+        conn.commit()
+
+
+def confirm_pending() -> int:
+    """
+    Look up receipts for the oldest pending registrations once. Confirmed
+    ones are indexed; reverted and expired ones are dropped. Returns how
+    many left the queue.
+    """
+    with _conn() as conn:
+        rows = conn.execute(
+            "SELECT * FROM pending_registrations ORDER BY submitted_at LIMIT ?",
+            (_CONFIRM_BATCH,),
+        ).fetchall()
+
+    settled = 0
+    for row in rows:
+        status, block_timestamp = receipt_status(row["tx_id"])
+        if status == "confirmed":
+            record_registration(row["file_hash"], row["tx_id"], row["case_id"], block_timestamp)
+        elif status == "failed":
+            print(f"[Registry] Registration {row['tx_id']} reverted")
+        elif time.time() - row["submitted_at"] > PENDING_TTL_S:
+            print(f"[Registry] Registration {row['tx_id']} not mined after {PENDING_TTL_S:g}s; giving up")
+        else:
+            continue
+        with _conn() as conn:
+            conn.execute("DELETE FROM pending_registrations WHERE tx_id = ?", (row["tx_id"],))
+            conn.commit()
+        settled += 1
+    return settled
+
+
+def _watch_receipts() -> None:
+    while True:
+        time.sleep(POLL_S)
+        try:
+            confirm_pending()
+        except Exception as e:
+            print(f"[Registry] Receipt check failed: {type(e).__name__}: {e}")
+
+
+def start_receipt_watcher() -> None:
+    """Start the background thread that confirms pending registrations."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = threading.Thread(target=_watch_receipts, name="receipt-watcher", daemon=True)
+            _watcher.start()
+
+
+def _verification(file_hash: str, entry: dict | None, source: str) -> dict:
+    return {
+        "file_hash": file_hash,
+        "registered_on_chain": entry is not None,
+        "blockchain_timestamp": entry["block_timestamp"] if entry else 0,
+        "case_id": entry["case_id"] if entry else "",
+        "tx_id": entry["tx_id"] if entry else None,
+        "source": source,
+    }
+
+
+def lookup_registrations(file_hashes: list[str]) -> dict[str, dict]:
+    """Return index entries for whichever of ``file_hashes`` are known."""
+    found = {}
+    with _conn() as conn:
+        for i in range(0, len(file_hashes), _LOOKUP_BATCH):
+            batch = file_hashes[i:i + _LOOKUP_BATCH]
+            rows = conn.execute(
+                f"SELECT * FROM chain_registrations WHERE file_hash IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            found.update((r["file_hash"], dict(r)) for r in rows)
+    return found
+
+
+def verify_many_locally(file_hashes: list[str]) -> dict[str, dict]:
+    """Verification results for the hashes found in the local index."""
+    return {
+        h: _verification(h, entry, "local_index")
+        for h, entry in lookup_registrations(file_hashes).items()
+    }
+
+
+def verify_locally(file_hash: str) -> dict | None:
+    """Verification result from the local index, or None on a miss."""
+    return verify_many_locally([file_hash]).get(file_hash)
+
+
+def verify_on_chain(file_hash: str) -> dict:
+    """Ask the contract directly, caching a positive answer in the index."""
+    exists, block_timestamp, case_id = verify_evidence(file_hash)
+    if not exists:
+        return _verification(file_hash, None, "chain")
+    record_registration(file_hash, None, case_id, int(block_timestamp), source="chain")
+    entry = {"block_timestamp": int(block_timestamp), "case_id": case_id, "tx_id": None}
+    return _verification(file_hash, entry, "chain")
@@ -2,13 +2,11 @@
 Chain of Custody Manager — tracks every custodian transfer for evidence.
 """
 import json
-import os
 import secrets
-import sqlite3
-import tempfile
 from datetime import datetime, timezone
 
-_DB_PATH = os.getenv("DB_PATH", os.path.join(tempfile.gettempdir(), "trustchain.db"))
+import group_commit
+from sqlite_pool import get_connection as _conn
 
 VALID_ROLES = [
     "Investigating Officer",
@@ -19,9 +17,8 @@ VALID_ROLES = [
     "Defense Counsel",
 ]
 
-
-def _conn():
-    return sqlite3.connect(_DB_PATH)
+# SQLite's default limit on bound parameters is 999
+_LOOKUP_BATCH = 500
 
 
 def init_custody_table() -> None:
@@ -40,50 +37,69 @@ def init_custody_table() -> None:
                 FOREIGN KEY (evidence_id) REFERENCES evidence(id)
             )
         """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_custody_evidence_time "
+            "ON custody_log(evidence_id, timestamp)"
+        )
         conn.commit()
 
 
-def add_custody_event(
+_INSERT_EVENT = """
+    INSERT INTO custody_log
+        (evidence_id, custodian_name, custodian_role, custodian_badge,
+         action, signature, notes, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def new_custody_event(
     evidence_id: str,
     custodian_name: str,
     custodian_role: str,
     custodian_badge: str = "",
     action: str = "transfer",
     notes: str = "",
-) -> dict:
-    """Add a custody transfer event. Returns the event record."""
-    timestamp = datetime.now(timezone.utc).isoformat()
-    signature = "0x" + secrets.token_hex(32)  # mock digital signature
-
-    with _conn() as conn:
-        conn.execute(
-            """
-            INSERT INTO custody_log
-                (evidence_id, custodian_name, custodian_role, custodian_badge,
-                 action, signature, notes, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (evidence_id, custodian_name, custodian_role, custodian_badge,
-             action, signature, notes, timestamp),
-        )
-        conn.commit()
-
-    return {
+) -> tuple[dict, tuple[str, tuple]]:
+    """
+    Stamp and sign a custody event without storing it. Returns the event
+    record and its insert statement, for callers that hand the statement
+    to group commit themselves.
+    """
+    event = {
         "evidence_id": evidence_id,
         "custodian_name": custodian_name,
         "custodian_role": custodian_role,
         "custodian_badge": custodian_badge,
         "action": action,
-        "signature": signature,
+        "signature": "0x" + secrets.token_hex(32),  # mock digital signature
         "notes": notes,
-        "timestamp": timestamp,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
+    params = (evidence_id, custodian_name, custodian_role, custodian_badge,
+              action, event["signature"], notes, event["timestamp"])
+    return event, (_INSERT_EVENT, params)
+
+
+def add_custody_event(
+    evidence_id: str,
+    custodian_name: str,
+    custodian_role: str,
+    custodian_badge: str = "",
+    action: str = "transfer",
+    notes: str = "",
+) -> dict:
+    """Add a custody transfer event. Returns the event record."""
+    event, statement = new_custody_event(
+        evidence_id, custodian_name, custodian_role, custodian_badge, action, notes
+    )
+    # Returns only once the event has committed
+    group_commit.write(*statement)
+    return event
 
 
 def get_custody_chain(evidence_id: str) -> list[dict]:
     """Get the full chain of custody for an evidence item."""
     with _conn() as conn:
-        conn.row_factory = sqlite3.Row
         rows = conn.execute(
             "SELECT * FROM custody_log WHERE evidence_id = ? ORDER BY timestamp ASC",
             (evidence_id,),
@@ -91,6 +107,26 @@ def get_custody_chain(evidence_id: str) -> list[dict]:
     return [dict(r) for r in rows]
 
 
+def get_custody_chains(evidence_ids: list[str]) -> dict[str, list[dict]]:
+    """
+    Get the chains of custody for many evidence items at once, keyed by
+    evidence id. Items with no custody events map to an empty list.
+    """
+    chains: dict[str, list[dict]] = {evidence_id: [] for evidence_id in evidence_ids}
+    ids = list(chains)
+    with _conn() as conn:
+        for i in range(0, len(ids), _LOOKUP_BATCH):
+            batch = ids[i:i + _LOOKUP_BATCH]
+            rows = conn.execute(
+                f"SELECT * FROM custody_log WHERE evidence_id IN ({','.join('?' * len(batch))}) "
+                "ORDER BY evidence_id, timestamp ASC",
+                batch,
+            ).fetchall()
+            for r in rows:
+                chains[r["evidence_id"]].append(dict(r))
+    return chains
+
+
 def auto_register_initial_custody(evidence_id: str) -> dict:
     """Auto-register the first custody entry when evidence is uploaded."""
     return add_custody_event(
@@ -1,14 +1,121 @@
+import base64
+import binascii
 import json
-import os
 import sqlite3
-import tempfile
 from datetime import datetime, timezone
 
-_DB_PATH = os.getenv("DB_PATH", os.path.join(tempfile.gettempdir(), "trustchain.db"))
+import group_commit
+from archive.cold_storage import ARCHIVED_COLUMNS, read_archived_rows, rehydrate
+from sqlite_pool import get_connection as _conn
+
+# Columns added after the original schema; created on existing databases by init_db()
+_ADDED_COLUMNS = {
+    "merkle_root": "TEXT",
+    "merkle_chunk_size": "INTEGER",
+    "merkle_leaves": "TEXT",
+    "c2pa_manifest": "TEXT",
+    "sms_beacon": "TEXT",
+    "archive_segment": "TEXT",
+    "rehydrated_at": "TEXT",
+}
+
+LIABILITY_PARTIES = ("user", "platform", "architect")
+
+# Liability percentages as virtual generated columns, so they can be indexed
+# and filtered in SQL without parsing liability_scores row by row
+_LIABILITY_COLUMNS = {
+    f"liability_{party}_pct": (
+        "INTEGER GENERATED ALWAYS AS (CASE WHEN json_valid(liability_scores) "
+        f"THEN json_extract(liability_scores, '$.{party}.percentage') END) VIRTUAL"
+    )
+    for party in LIABILITY_PARTIES
+}
+
+_JSON_FIELDS = (
+    "detection_result", "liability_scores", "merkle_leaves", "c2pa_manifest", "sms_beacon",
+)
+
+# Listing walks (created_at, id) newest first; the filtered variants lead with
+# the filter column so each filter is an index range scan rather than a sort.
+_INDEXES = {
+    "idx_evidence_created": "evidence(created_at DESC, id DESC)",
+    "idx_evidence_type_created": "evidence(detection_type, created_at DESC, id DESC)",
+    "idx_evidence_synthetic_created": "evidence(is_synthetic, created_at DESC, id DESC)",
+    **{f"idx_evidence_{name}": f"evidence({name})" for name in _LIABILITY_COLUMNS},
+}
+
+# One row per model_breakdown entry of detection_result, maintained by the
+# triggers below so every writer keeps it in sync.
+_DETECTION_SCORES_INSERT = """
+    INSERT INTO detection_scores (evidence_id, model_index, model_name, confidence, is_flagged)
+    SELECT {row}.id, CAST(m.key AS INTEGER), json_extract(m.value, '$.name'),
+           json_extract(m.value, '$.confidence'), json_extract(m.value, '$.is_flagged')
+    FROM {source} json_each(
+        CASE WHEN json_valid({row}.detection_result) THEN {row}.detection_result ELSE '{{}}' END,
+        '$.model_breakdown'
+    ) AS m
+"""
+_TRIGGER_INSERT = _DETECTION_SCORES_INSERT.format(row="NEW", source="")
+
+_DETECTION_SCORES_TRIGGERS = {
+    "trg_detection_scores_insert": f"""
+        AFTER INSERT ON evidence BEGIN
+            DELETE FROM detection_scores WHERE evidence_id = NEW.id;
+            {_TRIGGER_INSERT};
+        END
+    """,
+    # Archiving clears detection_result but the scores stay queryable
+    "trg_detection_scores_update": f"""
+        AFTER UPDATE OF detection_result ON evidence WHEN NEW.archive_segment IS NULL BEGIN
+            DELETE FROM detection_scores WHERE evidence_id = NEW.id;
+            {_TRIGGER_INSERT};
+        END
+    """,
+    "trg_detection_scores_delete": """
+        AFTER DELETE ON evidence BEGIN
+            DELETE FROM detection_scores WHERE evidence_id = OLD.id;
+        END
+    """,
+}
+
+# Columns read by list views. The Merkle leaf list can be thousands of hashes
+# per record, so listings only carry its length.
+_LIST_COLUMNS = (
+    "id, filename, file_hash, timestamp, detection_type, detection_confidence, "
+    "detection_result, is_synthetic, blockchain_tx_id, pdf_path, status, created_at, "
+    "merkle_root, merkle_chunk_size, json_array_length(merkle_leaves) AS merkle_chunk_count, "
+    "archive_segment"
+)
+
+# JSON columns list views only read when asked for
+OPTIONAL_LIST_COLUMNS = ("liability_scores", "c2pa_manifest", "sms_beacon")
+
+MAX_PAGE_SIZE = 200
+
+
+def ensure_columns(conn: sqlite3.Connection, table: str, columns: dict) -> None:
+    """Add any of ``columns`` (name -> declaration) missing from ``table``."""
+    # table_xinfo also lists generated columns, which table_info hides
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def create_triggers(conn: sqlite3.Connection, triggers: dict) -> None:
+    """Create ``triggers`` (name -> body), replacing any whose definition has changed."""
+    existing = dict(
+        conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    )
+    for name, body in triggers.items():
+        sql = f"CREATE TRIGGER {name} {body}"
+        if existing.get(name) != sql:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(sql)
 
 
 def init_db() -> None:
-    with sqlite3.connect(_DB_PATH) as conn:
+    with _conn() as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS evidence (
                 id TEXT PRIMARY KEY,
@@ -26,48 +133,131 @@ def init_db() -> None:
                 created_at TEXT
             )
         """)
+        ensure_columns(conn, "evidence", _ADDED_COLUMNS)
+        ensure_columns(conn, "evidence", _LIABILITY_COLUMNS)
+        for name, target in _INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+        _init_detection_scores(conn)
         conn.commit()
 
 
+def _init_detection_scores(conn: sqlite3.Connection) -> None:
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'detection_scores'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS detection_scores (
+            evidence_id TEXT NOT NULL,
+            model_index INTEGER NOT NULL,
+            model_name TEXT,
+            confidence REAL,
+            is_flagged INTEGER,
+            PRIMARY KEY (evidence_id, model_index)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detection_scores_model "
+        "ON detection_scores(model_name, confidence)"
+    )
+    create_triggers(conn, _DETECTION_SCORES_TRIGGERS)
+    if not exists:
+        # First run on an existing database: extract scores for stored records
+        conn.execute(_DETECTION_SCORES_INSERT.format(row="evidence", source="evidence,"))
+
+
+_SAVED_COLUMNS = (
+    "id", "filename", "file_hash", "timestamp", "detection_type",
+    "detection_confidence", "detection_result", "is_synthetic",
+    "blockchain_tx_id", "liability_scores", "pdf_path", "status", "created_at",
+    "merkle_root", "merkle_chunk_size", "merkle_leaves", "c2pa_manifest", "sms_beacon",
+)
+
+# An upsert rather than INSERT OR REPLACE: re-saving a record updates it in
+# place, keeping its rowid and firing the UPDATE triggers that maintain the
+# side tables, instead of a silent delete-and-reinsert. A full re-save also
+# supersedes any archived copy, so the row stops being a cold-storage stub.
+_SAVE_SQL = f"""
+    INSERT INTO evidence ({", ".join(_SAVED_COLUMNS)})
+    VALUES ({", ".join("?" * len(_SAVED_COLUMNS))})
+    ON CONFLICT(id) DO UPDATE SET
+        {", ".join(f"{c} = excluded.{c}" for c in _SAVED_COLUMNS[1:])},
+        archive_segment = NULL
+"""
+
+
+def save_statement(data: dict) -> tuple[str, tuple]:
+    """The upsert for ``data``, for callers that hand it to group commit themselves."""
+    return _SAVE_SQL, (
+        data.get("id"),
+        data.get("filename"),
+        data.get("file_hash"),
+        data.get("timestamp"),
+        data.get("detection_type"),
+        data.get("detection_confidence"),
+        json.dumps(data.get("detection_result", {})),
+        data.get("is_synthetic"),
+        data.get("blockchain_tx_id"),
+        json.dumps(data.get("liability_scores", {})),
+        data.get("pdf_path"),
+        data.get("status", "processed"),
+        data.get("created_at", datetime.now(timezone.utc).isoformat()),
+        data.get("merkle_root"),
+        data.get("merkle_chunk_size"),
+        json.dumps(data["merkle_leaves"]) if data.get("merkle_leaves") else None,
+        json.dumps(data["c2pa_manifest"]) if data.get("c2pa_manifest") else None,
+        json.dumps(data["sms_beacon"]) if data.get("sms_beacon") else None,
+    )
+
+
 def save_evidence(data: dict) -> None:
-    with sqlite3.connect(_DB_PATH) as conn:
+    """Insert or update a record; returns once the write has committed."""
+    group_commit.write(*save_statement(data))
+
+
+def save_provenance(
+    evidence_id: str, c2pa_manifest: dict | None, sms_beacon: dict | None
+) -> None:
+    """
+    Store the manifest and/or beacon of a record that does not have them yet;
+    either may be None to leave that column alone.
+    """
+    with _conn() as conn:
+        # Never overwrite: the first stored manifest is the one that was issued
         conn.execute(
             """
-            INSERT OR REPLACE INTO evidence
-                (id, filename, file_hash, timestamp, detection_type,
-                 detection_confidence, detection_result, is_synthetic,
-                 blockchain_tx_id, liability_scores, pdf_path, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            UPDATE evidence
+            SET c2pa_manifest = COALESCE(c2pa_manifest, ?),
+                sms_beacon = COALESCE(sms_beacon, ?)
+            WHERE id = ?
             """,
             (
-                data.get("id"),
-                data.get("filename"),
-                data.get("file_hash"),
-                data.get("timestamp"),
-                data.get("detection_type"),
-                data.get("detection_confidence"),
-                json.dumps(data.get("detection_result", {})),
-                data.get("is_synthetic"),
-                data.get("blockchain_tx_id"),
-                json.dumps(data.get("liability_scores", {})),
-                data.get("pdf_path"),
-                data.get("status", "processed"),
-                data.get("created_at", datetime.now(timezone.utc).isoformat()),
+                json.dumps(c2pa_manifest) if c2pa_manifest is not None else None,
+                json.dumps(sms_beacon) if sms_beacon is not None else None,
+                evidence_id,
             ),
         )
         conn.commit()
 
 
-def get_evidence(evidence_id: str) -> dict | None:
-    with sqlite3.connect(_DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        row = conn.execute(
-            "SELECT * FROM evidence WHERE id = ?", (evidence_id,)
-        ).fetchone()
-    if row is None:
-        return None
+def get_evidence_missing_provenance(after_id: str = "", limit: int = 500) -> list[dict]:
+    """Records without a stored manifest or beacon, in id order after ``after_id``."""
+    with _conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, file_hash, timestamp, created_at, detection_type, detection_result
+            FROM evidence
+            WHERE id > ? AND (c2pa_manifest IS NULL OR sms_beacon IS NULL)
+              AND archive_segment IS NULL
+            ORDER BY id LIMIT ?
+            """,
+            (after_id, limit),
+        ).fetchall()
+    return [_decode_row(row) for row in rows]
+
+
+def _decode_row(row: sqlite3.Row) -> dict:
     record = dict(row)
-    for field in ("detection_result", "liability_scores"):
+    for field in _JSON_FIELDS:
         if record.get(field):
             try:
                 record[field] = json.loads(record[field])
@@ -76,21 +266,169 @@ def get_evidence(evidence_id: str) -> dict | None:
     return record
 
 
-def get_all_evidence() -> list[dict]:
-    """Return all evidence records, newest first."""
-    with sqlite3.connect(_DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
+def get_evidence(evidence_id: str) -> dict | None:
+    """The full record; an archived record is rehydrated into the hot tier first."""
+    with _conn() as conn:
+        row = conn.execute(
+            "SELECT * FROM evidence WHERE id = ?", (evidence_id,)
+        ).fetchone()
+        if row is not None and row["archive_segment"]:
+            rehydrate(evidence_id, row["archive_segment"])
+            row = conn.execute(
+                "SELECT * FROM evidence WHERE id = ?", (evidence_id,)
+            ).fetchone()
+    if row is None:
+        return None
+    return _decode_row(row)
+
+
+def get_detection_model_names() -> list[str]:
+    """Distinct model names found in stored ``model_breakdown`` entries."""
+    with _conn() as conn:
         rows = conn.execute(
-            "SELECT * FROM evidence ORDER BY created_at DESC"
+            "SELECT DISTINCT model_name FROM detection_scores "
+            "WHERE model_name IS NOT NULL ORDER BY model_name"
         ).fetchall()
-    results = []
+    return [r[0] for r in rows]
+
+
+def _encode_cursor(created_at: str, evidence_id: str) -> str:
+    raw = json.dumps([created_at, evidence_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of ``_encode_cursor``; raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, evidence_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, ValueError):
+        raise ValueError("invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(evidence_id, str):
+        raise ValueError("invalid cursor")
+    return created_at, evidence_id
+
+
+def _with_archived_columns(rows: list, archived: dict[str, dict]) -> list[dict]:
+    """Fill the columns moved to cold storage back into archived list rows."""
+    merged = []
     for row in rows:
         record = dict(row)
-        for field in ("detection_result", "liability_scores"):
-            if record.get(field):
-                try:
-                    record[field] = json.loads(record[field])
-                except (json.JSONDecodeError, TypeError):
-                    pass
-        results.append(record)
-    return results
+        cold = archived.get(record["id"])
+        if cold is not None:
+            for column in ARCHIVED_COLUMNS:
+                if column in record:
+                    record[column] = cold.get(column)
+            if "merkle_chunk_count" in record and cold.get("merkle_leaves"):
+                record["merkle_chunk_count"] = len(json.loads(cold["merkle_leaves"]))
+        merged.append(record)
+    return merged
+
+
+def list_evidence(
+    limit: int = 50,
+    cursor: str | None = None,
+    detection_type: str | None = None,
+    is_synthetic: bool | None = None,
+    min_confidence: float | None = None,
+    max_confidence: float | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+    model: str | None = None,
+    model_min_confidence: float | None = None,
+    model_max_confidence: float | None = None,
+    model_flagged: bool | None = None,
+    liability_party: str | None = None,
+    min_liability: int | None = None,
+    max_liability: int | None = None,
+    include_columns: tuple[str, ...] = (),
+) -> tuple[list[dict], str | None]:
+    """
+    Return one page of evidence records, newest first, and the cursor for
+    the next page (None on the last page).
+
+    Pagination is keyset-based on ``(created_at, id)``, so every page costs
+    an index seek regardless of how deep into the listing it is.
+    ``created_after``/``created_before`` are ISO-8601 UTC timestamps
+    (inclusive/exclusive).
+
+    ``model`` restricts to records whose ``model_breakdown`` has an entry of
+    that name matching the ``model_*`` bounds, via the ``detection_scores``
+    side table. ``liability_party`` (one of ``LIABILITY_PARTIES``) with
+    ``min_liability``/``max_liability`` filters on that party's percentage
+    through its indexed generated column.
+
+    Records carry ``merkle_chunk_count`` rather than
+    the full leaf list; the ``OPTIONAL_LIST_COLUMNS`` JSON blobs are only
+    read when named in ``include_columns``.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    clauses, params = [], []
+    if cursor:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(_decode_cursor(cursor))
+    if detection_type is not None:
+        clauses.append("detection_type = ?")
+        params.append(detection_type)
+    if is_synthetic is not None:
+        clauses.append("is_synthetic = ?")
+        params.append(int(is_synthetic))
+    if min_confidence is not None:
+        clauses.append("detection_confidence >= ?")
+        params.append(min_confidence)
+    if max_confidence is not None:
+        clauses.append("detection_confidence <= ?")
+        params.append(max_confidence)
+    if created_after is not None:
+        clauses.append("created_at >= ?")
+        params.append(created_after)
+    if created_before is not None:
+        clauses.append("created_at < ?")
+        params.append(created_before)
+    if model is not None:
+        score_clauses, score_params = ["model_name = ?"], [model]
+        if model_min_confidence is not None:
+            score_clauses.append("confidence >= ?")
+            score_params.append(model_min_confidence)
+        if model_max_confidence is not None:
+            score_clauses.append("confidence <= ?")
+            score_params.append(model_max_confidence)
+        if model_flagged is not None:
+            score_clauses.append("is_flagged = ?")
+            score_params.append(int(model_flagged))
+        clauses.append(
+            f"id IN (SELECT evidence_id FROM detection_scores WHERE {' AND '.join(score_clauses)})"
+        )
+        params.extend(score_params)
+    if liability_party is not None:
+        if liability_party not in LIABILITY_PARTIES:
+            raise ValueError(f"liability_party must be one of {', '.join(LIABILITY_PARTIES)}")
+        column = f"liability_{liability_party}_pct"
+        if min_liability is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(min_liability)
+        if max_liability is not None:
+            clauses.append(f"{column} <= ?")
+            params.append(max_liability)
+
+    extra = [c for c in OPTIONAL_LIST_COLUMNS if c in include_columns]
+    columns = ", ".join([_LIST_COLUMNS, *extra])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _conn() as conn:
+        rows = conn.execute(
+            f"SELECT {columns} FROM evidence {where} "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+    page = rows[:limit]
+    stubs = [(r["id"], r["archive_segment"]) for r in page if r["archive_segment"]]
+    if stubs:
+        # Read archived pages from cold storage without thawing them
+        page = _with_archived_columns(page, read_archived_rows(stubs))
+    records = [_decode_row(row) for row in page]
+    next_cursor = None
+    if len(rows) > limit:
+        last = records[-1]
+        next_cursor = _encode_cursor(last["created_at"], last["id"])
+    return records, next_cursor
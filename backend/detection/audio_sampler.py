@@ -0,0 +1,44 @@
+"""
+Streaming audio decoding.
+
+Decodes the first audio stream with PyAV and resamples it to mono float32
+at a fixed rate. Blocks are yielded as they come off the decoder, so a
+file path input of any length is never held in memory.
+"""
+import io
+
+import numpy as np
+
+try:
+    import av
+    HAS_AV = True
+except ImportError:
+    HAS_AV = False
+
+
+def native_rate(source: str | bytes) -> int:
+    """Sample rate of the first audio stream as recorded, or 0 if unknown."""
+    if not HAS_AV:
+        raise RuntimeError("PyAV is not installed; audio cannot be probed.")
+    with av.open(io.BytesIO(source) if isinstance(source, bytes) else source) as container:
+        return int(container.streams.audio[0].sample_rate or 0)
+
+
+def iter_audio(source: str | bytes, sample_rate: int):
+    """
+    Yield 1-D float32 arrays of mono samples in [-1, 1] at ``sample_rate``.
+    ``source`` is a file path or the bytes of an in-memory upload.
+    """
+    if not HAS_AV:
+        raise RuntimeError("PyAV is not installed; audio cannot be decoded.")
+
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+    with av.open(io.BytesIO(source) if isinstance(source, bytes) else source) as container:
+        stream = container.streams.audio[0]
+        stream.thread_type = "AUTO"
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                yield out.to_ndarray().reshape(-1).astype(np.float32, copy=False)
+        # Drain the samples still buffered in the resampler
+        for out in resampler.resample(None):
+            yield out.to_ndarray().reshape(-1).astype(np.float32, copy=False)
@@ -0,0 +1,130 @@
+"""
+Content-addressed detection result cache.
+
+Results are keyed by (file_hash, detector, model_version, prompt_digest), so
+re-uploading the same bytes reuses an earlier verdict while any change to
+the model or prompt naturally misses. Entries live in SQLite behind an
+in-process LRU.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlite_pool import get_connection as _conn
+
+_LRU_SIZE = int(os.getenv("DETECTION_CACHE_LRU_SIZE", "1024"))
+
+_lru: OrderedDict[tuple, dict] = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def init_detection_cache_table() -> None:
+    with _conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS detection_cache (
+                file_hash TEXT NOT NULL,
+                detector TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                prompt_digest TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (file_hash, detector, model_version, prompt_digest)
+            )
+        """)
+        conn.commit()
+
+
+def _lru_get(key: tuple) -> dict | None:
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is not None:
+            _lru.move_to_end(key)
+        return entry
+
+
+def _lru_put(key: tuple, entry: dict) -> None:
+    with _lru_lock:
+        _lru[key] = entry
+        _lru.move_to_end(key)
+        while len(_lru) > _LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def get_cached_detection(
+    file_hash: str, detector: str, model_version: str, prompt_digest: str
+) -> dict | None:
+    """Return ``{"result": ..., "created_at": ...}`` for a cached verdict, or None."""
+    key = (file_hash, detector, model_version, prompt_digest)
+    entry = _lru_get(key)
+    if entry is not None:
+        return entry
+
+    with _conn() as conn:
+        row = conn.execute(
+            """
+            SELECT result, created_at FROM detection_cache
+            WHERE file_hash = ? AND detector = ? AND model_version = ? AND prompt_digest = ?
+            """,
+            key,
+        ).fetchone()
+    if row is None:
+        return None
+    try:
+        entry = {"result": json.loads(row[0]), "created_at": row[1]}
+    except (json.JSONDecodeError, TypeError):
+        return None
+    _lru_put(key, entry)
+    return entry
+
+
+def put_cached_detection(
+    file_hash: str, detector: str, model_version: str, prompt_digest: str, result: dict
+) -> None:
+    key = (file_hash, detector, model_version, prompt_digest)
+    created_at = datetime.now(timezone.utc).isoformat()
+    with _conn() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO detection_cache
+                (file_hash, detector, model_version, prompt_digest, result, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (*key, json.dumps(result), created_at),
+        )
+        conn.commit()
+    _lru_put(key, {"result": result, "created_at": created_at})
+
+
+def invalidate_detection_cache(
+    file_hash: str | None = None,
+    detector: str | None = None,
+    keep: tuple[str, str] | None = None,
+) -> int:
+    """
+    Delete cached verdicts matching the given filters and return the count.
+
+    ``keep`` is a ``(model_version, prompt_digest)`` pair; when given, only
+    entries produced by a different model version or prompt are removed.
+    """
+    clauses, params = [], []
+    if file_hash:
+        clauses.append("file_hash = ?")
+        params.append(file_hash)
+    if detector:
+        clauses.append("detector = ?")
+        params.append(detector)
+    if keep:
+        clauses.append("NOT (model_version = ? AND prompt_digest = ?)")
+        params.extend(keep)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    with _conn() as conn:
+        cur = conn.execute(f"DELETE FROM detection_cache {where}", params)
+        conn.commit()
+        deleted = cur.rowcount
+
+    with _lru_lock:
+        _lru.clear()
+    return deleted
@@ -0,0 +1,172 @@
+"""
+Shared Gemini client and call limiter.
+
+``get_client`` hands every caller the same ``genai.Client``, created on
+first use. Its HTTP connection pool, TLS sessions and auth setup are reused
+across calls. A new client is built only if ``GEMINI_API_KEY`` changes.
+
+``slot()`` bounds Gemini traffic from this process. At most
+``GEMINI_MAX_CONCURRENCY`` analyses run at once. Each one also takes a
+token from a bucket refilled at ``GEMINI_REQUESTS_PER_MINUTE``, holding up
+to ``GEMINI_BURST`` tokens. A burst of uploads therefore queues here instead
+of tripping the API quota. ``metrics()`` reports how many calls are in
+flight and waiting, which is what to watch when sizing
+``PIPELINE_DETECTION_WORKERS``.
+
+``delete_file_later`` removes uploaded File API objects on a small
+background pool, so the cleanup round trip never delays a verdict.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    from google import genai
+    HAS_GENAI = True
+except ImportError:
+    HAS_GENAI = False
+
+from metrics import percentile
+
+MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+BURST = int(os.getenv("GEMINI_BURST", "5"))
+CLEANUP_WORKERS = int(os.getenv("GEMINI_CLEANUP_WORKERS", "2"))
+
+# Recent calls kept for the wait-time percentiles
+_SAMPLE_SIZE = 1024
+
+_client = None
+_client_key: str | None = None
+_client_lock = threading.Lock()
+
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_bucket_lock = threading.Lock()
+_tokens = float(BURST)
+_refilled = time.monotonic()
+
+_metrics_lock = threading.Lock()
+_totals = {
+    "waiting": 0, "in_flight": 0, "calls": 0, "failed_calls": 0, "clients_created": 0,
+    "inline_payloads": 0, "file_uploads": 0, "pending_deletes": 0, "failed_deletes": 0,
+}
+_wait_ms: deque = deque(maxlen=_SAMPLE_SIZE)
+
+_cleanup = ThreadPoolExecutor(max_workers=CLEANUP_WORKERS, thread_name_prefix="gemini-cleanup")
+
+
+def get_client(api_key: str):
+    """The process-wide client for ``api_key``, created on first use."""
+    global _client, _client_key
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            _client = genai.Client(api_key=api_key)
+            _client_key = api_key
+            with _metrics_lock:
+                _totals["clients_created"] += 1
+        return _client
+
+
+def _take_token() -> None:
+    global _tokens, _refilled
+    if REQUESTS_PER_MINUTE <= 0:
+        return
+    per_second = REQUESTS_PER_MINUTE / 60
+    while True:
+        with _bucket_lock:
+            now = time.monotonic()
+            _tokens = min(BURST, _tokens + (now - _refilled) * per_second)
+            _refilled = now
+            if _tokens >= 1:
+                _tokens -= 1
+                return
+            delay = (1 - _tokens) / per_second
+        time.sleep(delay)
+
+
+@contextmanager
+def slot():
+    """
+    Hold one of the concurrent-call slots and one rate token for the
+    duration of a Gemini analysis. Blocks until both are available.
+    """
+    queued = time.perf_counter()
+    with _metrics_lock:
+        _totals["waiting"] += 1
+    try:
+        _slots.acquire()
+        try:
+            _take_token()
+        except BaseException:
+            _slots.release()
+            raise
+    finally:
+        with _metrics_lock:
+            _totals["waiting"] -= 1
+
+    with _metrics_lock:
+        _totals["in_flight"] += 1
+        _wait_ms.append((time.perf_counter() - queued) * 1000)
+    try:
+        yield
+    except BaseException:
+        with _metrics_lock:
+            _totals["failed_calls"] += 1
+        raise
+    finally:
+        with _metrics_lock:
+            _totals["in_flight"] -= 1
+            _totals["calls"] += 1
+        _slots.release()
+
+
+def count(name: str) -> None:
+    """Bump one of the payload counters reported by ``metrics()``."""
+    with _metrics_lock:
+        _totals[name] += 1
+
+
+def _delete(client, name: str) -> None:
+    try:
+        client.files.delete(name=name)
+    except Exception as e:
+        print(f"[Gemini Client] Deleting uploaded file {name} failed: {e}")
+        with _metrics_lock:
+            _totals["failed_deletes"] += 1
+    finally:
+        with _metrics_lock:
+            _totals["pending_deletes"] -= 1
+
+
+def delete_file_later(client, name: str) -> None:
+    """Delete an uploaded File API object in the background."""
+    with _metrics_lock:
+        _totals["pending_deletes"] += 1
+    _cleanup.submit(_delete, client, name)
+
+
+def metrics() -> dict:
+    """Limiter settings, current queue depth and in-flight calls, and recent wait times."""
+    with _metrics_lock:
+        totals = dict(_totals)
+        waits = list(_wait_ms)
+    with _bucket_lock:
+        tokens = _tokens
+        if REQUESTS_PER_MINUTE > 0:
+            tokens = min(BURST, tokens + (time.monotonic() - _refilled) * REQUESTS_PER_MINUTE / 60)
+    return {
+        "max_concurrency": MAX_CONCURRENCY,
+        "requests_per_minute": REQUESTS_PER_MINUTE,
+        "burst": BURST,
+        "tokens_available": round(tokens, 2),
+        **totals,
+        # Time from asking for a slot to starting the call
+        "wait_ms": {
+            "p50": round(percentile(waits, 50), 3),
+            "p95": round(percentile(waits, 95), 3),
+            "max": round(max(waits, default=0.0), 3),
+        },
+    }
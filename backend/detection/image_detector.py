@@ -18,18 +18,25 @@ _HF_MODEL = "prithivMLmods/Deep-Fake-Detector-v2-Model"
 _HF_API_URL = f"https://api-inference.huggingface.co/models/{_HF_MODEL}"
 
 
-def _call_huggingface(file_path: str, api_token: str) -> dict | None:
-    """Call the HF Inference API with the image file. Returns parsed result or None on failure."""
+def _call_huggingface(source: str | bytes, api_token: str) -> dict | None:
+    """
+    Call the HF Inference API with the image (a file path or the raw bytes of
+    an in-memory upload). Returns parsed result or None on failure.
+    """
     headers = {"Authorization": f"Bearer {api_token}"}
 
     try:
-        with open(file_path, "rb") as f:
-            response = http_requests.post(
-                _HF_API_URL,
-                headers=headers,
-                data=f.read(),
-                timeout=30,
-            )
+        if isinstance(source, bytes):
+            payload = source
+        else:
+            with open(source, "rb") as f:
+                payload = f.read()
+        response = http_requests.post(
+            _HF_API_URL,
+            headers=headers,
+            data=payload,
+            timeout=30,
+        )
 
         if response.status_code != 200:
             print(f"[HF API] Error {response.status_code}: {response.text[:200]}")
@@ -154,9 +161,10 @@ def _mock_image_detection() -> dict:
     }
 
 
-def detect_image(file_path: str) -> dict:
+def detect_image(source: str | bytes) -> dict:
     """
     Detect whether an image is a deepfake using Hugging Face Inference API.
+    ``source`` is a file path or the image bytes.
     Falls back to mock mode if HF_API_TOKEN is not set.
     """
     mode = os.getenv("DETECTION_MODE", "mock")
@@ -170,7 +178,7 @@ def detect_image(file_path: str) -> dict:
     # Try real AI detection if token is available
     if api_token:
         print(f"[Image Detector] Using HuggingFace model: {_HF_MODEL}")
-        hf_results = _call_huggingface(file_path, api_token)
+        hf_results = _call_huggingface(source, api_token)
 
         if hf_results is not None:
             return _parse_hf_results(hf_results)
@@ -0,0 +1,195 @@
+"""
+Group commit for high-volume inserts.
+
+Writes submitted from any thread are queued for a single writer thread.
+That thread takes the first waiting write, then collects whatever else
+arrives within ``GROUP_COMMIT_WINDOW_MS`` (or until ``GROUP_COMMIT_MAX_BATCH``
+writes are waiting), and commits the lot in one transaction. Under
+concurrent ingest, one commit, with its WAL append and lock round-trip,
+serves many requests.
+
+``write()`` blocks until the transaction holding the caller's statements
+has committed, so a caller that gets a response knows its row is as
+durable as ``SQLITE_SYNCHRONOUS`` makes any commit. Each write runs inside
+its own savepoint. A failing write is rolled back alone, and its error is
+raised in the caller's thread, while the rest of the batch commits.
+
+Set ``GROUP_COMMIT_ENABLED=false`` to run each write in its own transaction
+on the caller's connection instead.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import percentile
+from sqlite_pool import get_connection as _conn
+
+ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "true").lower() == "true"
+WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "128"))
+
+# Recent batches kept for the percentile metrics
+_SAMPLE_SIZE = 1024
+
+_queue: queue.Queue = queue.Queue()
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_totals = {"batches": 0, "writes": 0, "failed_writes": 0, "failed_commits": 0}
+_samples: deque = deque(maxlen=_SAMPLE_SIZE)  # (batch_size, commit_ms, max_wait_ms)
+
+
+def write(sql: str, params: tuple = ()) -> None:
+    """Run one statement in the next group commit and wait for it to commit."""
+    write_all([(sql, params)])
+
+
+def write_all(statements: list[tuple[str, tuple]]) -> None:
+    """
+    Run several statements atomically in the next group commit and wait for
+    it to commit. Raises whatever the statements or the commit raised.
+    """
+    submit(statements).result()
+
+
+def submit(statements: list[tuple[str, tuple]]) -> Future:
+    """
+    Queue statements for the next group commit without waiting. The returned
+    future resolves once they have committed, so async callers can await it
+    (``asyncio.wrap_future``) without holding a thread. When group commit is
+    disabled the statements run and commit here, before this returns.
+    """
+    done: Future = Future()
+    if not ENABLED:
+        try:
+            with _conn() as conn:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+        except Exception as e:
+            done.set_exception(e)
+        else:
+            done.set_result(None)
+        return done
+    _ensure_writer()
+    _queue.put((statements, done, time.perf_counter()))
+    return done
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run_writer, name="group-commit", daemon=True)
+            _writer.start()
+
+
+def _collect() -> list:
+    batch = [_queue.get()]
+    deadline = time.perf_counter() + WINDOW_MS / 1000
+    while len(batch) < MAX_BATCH:
+        try:
+            batch.append(_queue.get_nowait())
+            continue
+        except queue.Empty:
+            pass
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run_writer() -> None:
+    while True:
+        batch = _collect()
+        _commit(batch)
+
+
+def _commit(batch: list) -> None:
+    conn = _conn()
+    started = time.perf_counter()
+    results: list[BaseException | None] = []
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for statements, _, _ in batch:
+            conn.execute("SAVEPOINT group_write")
+            try:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+            except Exception as e:
+                conn.execute("ROLLBACK TO group_write")
+                results.append(e)
+            else:
+                results.append(None)
+            conn.execute("RELEASE group_write")
+        conn.commit()
+    except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
+        print(f"[GroupCommit] Commit of {len(batch)} writes failed: {e}")
+        with _metrics_lock:
+            _totals["failed_commits"] += 1
+        for _, done, _ in batch:
+            done.set_exception(e)
+        return
+
+    committed = time.perf_counter()
+    failed = sum(1 for r in results if r is not None)
+    with _metrics_lock:
+        _totals["batches"] += 1
+        _totals["writes"] += len(batch)
+        _totals["failed_writes"] += failed
+        _samples.append((
+            len(batch),
+            (committed - started) * 1000,
+            max((committed - queued) * 1000 for _, _, queued in batch),
+        ))
+    for (_, done, _), error in zip(batch, results):
+        if error is None:
+            done.set_result(None)
+        else:
+            done.set_exception(error)
+
+
+def metrics() -> dict:
+    """Totals since startup plus batch-size and latency stats over recent batches."""
+    with _metrics_lock:
+        totals = dict(_totals)
+        samples = list(_samples)
+    sizes = [s[0] for s in samples]
+    commit_ms = [s[1] for s in samples]
+    ack_ms = [s[2] for s in samples]
+    return {
+        "enabled": ENABLED,
+        "window_ms": WINDOW_MS,
+        "max_batch": MAX_BATCH,
+        "queued": _queue.qsize(),
+        **totals,
+        "recent_batches": len(samples),
+        "batch_size": {
+            "mean": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "p50": percentile(sizes, 50),
+            "p95": percentile(sizes, 95),
+            "max": max(sizes, default=0),
+        },
+        "commit_latency_ms": {
+            "p50": round(percentile(commit_ms, 50), 3),
+            "p95": round(percentile(commit_ms, 95), 3),
+            "p99": round(percentile(commit_ms, 99), 3),
+        },
+        # Slowest caller in each batch: queue wait + window + commit
+        "ack_latency_ms": {
+            "p50": round(percentile(ack_ms, 50), 3),
+            "p95": round(percentile(ack_ms, 95), 3),
+            "p99": round(percentile(ack_ms, 99), 3),
+        },
+    }
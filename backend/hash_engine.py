@@ -1,4 +1,35 @@
 import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
+
+# Large copy buffer for spooling uploads; reused per thread to avoid
+# re-allocating a megabyte for every request.
+_SPOOL_BUFFER_SIZE = 1024 * 1024
+_local = threading.local()
+
+# Uploads up to this size are hashed and analysed straight from memory; only
+# larger ones are spilled to a temporary file.
+INMEMORY_UPLOAD_MAX_BYTES = int(os.getenv("INMEMORY_UPLOAD_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Merkle mode: fixed-size chunks are hashed as leaves in parallel. hashlib
+# releases the GIL on large buffers, so a thread pool uses every core.
+MERKLE_CHUNK_SIZE = int(os.getenv("MERKLE_CHUNK_SIZE", str(4 * 1024 * 1024)))
+_MERKLE_WORKERS = int(os.getenv("MERKLE_WORKERS", str(os.cpu_count() or 4)))
+_merkle_pool: ThreadPoolExecutor | None = None
+_merkle_pool_lock = threading.Lock()
+
+# RFC 6962-style domain separation so a leaf can never be passed off as a node
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def _spool_buffer() -> bytearray:
+    buf = getattr(_local, "buffer", None)
+    if buf is None:
+        buf = _local.buffer = bytearray(_SPOOL_BUFFER_SIZE)
+    return buf
 
 
 def hash_file(file_path: str) -> str:
@@ -7,3 +38,183 @@ def hash_file(file_path: str) -> str:
         while chunk := f.read(8192):
             sha256.update(chunk)
     return sha256.hexdigest()
+
+
+def _copy_and_hash(src: BinaryIO, out: BinaryIO | None, sha256) -> None:
+    buf = _spool_buffer()
+    view = memoryview(buf)
+    readinto = getattr(src, "readinto", None)
+
+    while True:
+        if readinto is not None:
+            n = readinto(buf)
+            if not n:
+                break
+            chunk = view[:n]
+        else:
+            chunk = src.read(_SPOOL_BUFFER_SIZE)
+            if not chunk:
+                break
+        sha256.update(chunk)
+        if out is not None:
+            out.write(chunk)
+
+
+def hash_stream(src: BinaryIO) -> str:
+    """Return the SHA-256 hex digest of a stream without writing it anywhere."""
+    sha256 = hashlib.sha256()
+    _copy_and_hash(src, None, sha256)
+    return sha256.hexdigest()
+
+
+def spool_and_hash(src: BinaryIO, dest_path: str) -> str:
+    """
+    Copy ``src`` into ``dest_path`` and return its SHA-256 hex digest.
+
+    The hash is updated from the same buffer that is written to disk, so
+    every byte of the upload is read exactly once.
+    """
+    sha256 = hashlib.sha256()
+    with open(dest_path, "wb") as out:
+        _copy_and_hash(src, out, sha256)
+    return sha256.hexdigest()
+
+
+def spool_upload(
+    src: BinaryIO, dest_path: str, memory_limit: int = INMEMORY_UPLOAD_MAX_BYTES
+) -> tuple[str, bytes | str]:
+    """
+    Hash an upload, keeping it in memory when it is at most ``memory_limit``
+    bytes and spilling it to ``dest_path`` only when it is larger.
+
+    Returns ``(sha256, source)`` where ``source`` is the payload bytes or
+    ``dest_path``.
+    """
+    head = src.read(memory_limit + 1)
+    sha256 = hashlib.sha256(head)
+    if len(head) <= memory_limit:
+        return sha256.hexdigest(), head
+    with open(dest_path, "wb") as out:
+        out.write(head)
+        _copy_and_hash(src, out, sha256)
+    return sha256.hexdigest(), dest_path
+
+
+def _get_merkle_pool() -> ThreadPoolExecutor:
+    global _merkle_pool
+    with _merkle_pool_lock:
+        if _merkle_pool is None:
+            _merkle_pool = ThreadPoolExecutor(
+                max_workers=_MERKLE_WORKERS, thread_name_prefix="trustchain-merkle"
+            )
+        return _merkle_pool
+
+
+def hash_chunk(data: bytes) -> str:
+    """Return the Merkle leaf hash of one chunk."""
+    h = hashlib.sha256(_LEAF_PREFIX)
+    h.update(data)
+    return h.hexdigest()
+
+
+def _hash_node(left: str, right: str) -> str:
+    return hashlib.sha256(_NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def merkle_root(leaves: list[str]) -> str:
+    """Fold leaf hashes into a root; an odd node at any level is carried up as-is."""
+    if not leaves:
+        return hash_chunk(b"")
+    level = list(leaves)
+    while len(level) > 1:
+        nxt = [_hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+    return level[0]
+
+
+def merkle_proof(leaves: list[str], index: int) -> list[dict]:
+    """Return the sibling path proving ``leaves[index]`` is under the root."""
+    if not 0 <= index < len(leaves):
+        raise IndexError(f"chunk index {index} out of range")
+    proof = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({
+                "hash": level[sibling],
+                "position": "left" if sibling < index else "right",
+            })
+        nxt = [_hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(leaf: str, proof: list[dict], root: str) -> bool:
+    node = leaf
+    for step in proof:
+        if step["position"] == "left":
+            node = _hash_node(step["hash"], node)
+        else:
+            node = _hash_node(node, step["hash"])
+    return node == root
+
+
+def _merkle_summary(leaves: list[str], chunk_size: int) -> dict:
+    return {
+        "root": merkle_root(leaves),
+        "chunk_size": chunk_size,
+        "leaves": leaves,
+    }
+
+
+def _read_full(src: BinaryIO, size: int) -> bytes:
+    """Read up to ``size`` bytes, looping over short reads from streams."""
+    parts = []
+    remaining = size
+    while remaining:
+        part = src.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts)
+
+
+def spool_and_merkle_hash(
+    src: BinaryIO, dest_path: str, chunk_size: int = MERKLE_CHUNK_SIZE
+) -> tuple[str, dict]:
+    """
+    Like ``spool_and_hash``, but also hashes each ``chunk_size`` chunk as a
+    Merkle leaf on the worker pool while the flat SHA-256 is computed.
+
+    The flat SHA-256 is still what gets registered and verified, and it can
+    only be computed in order, on this thread. The leaves add per-segment
+    proofs on top of it; they do not make ingest faster than
+    ``spool_and_hash``, which skips the extra hashing and copies.
+
+    Returns ``(sha256, merkle)`` where ``merkle`` holds the root, chunk size
+    and ordered leaf hashes.
+    """
+    pool = _get_merkle_pool()
+    max_pending = _MERKLE_WORKERS * 2
+    sha256 = hashlib.sha256()
+    futures = []
+    leaves: list[str] = []
+
+    with open(dest_path, "wb") as out:
+        while chunk := _read_full(src, chunk_size):
+            sha256.update(chunk)
+            out.write(chunk)
+            futures.append(pool.submit(hash_chunk, chunk))
+            # Bound the number of chunks held in memory
+            if len(futures) - len(leaves) >= max_pending:
+                leaves.append(futures[len(leaves)].result())
+
+    leaves.extend(f.result() for f in futures[len(leaves):])
+    return sha256.hexdigest(), _merkle_summary(leaves, chunk_size)
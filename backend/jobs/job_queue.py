@@ -0,0 +1,123 @@
+"""
+Job Queue — SQLite-backed queue for asynchronous evidence processing.
+
+Each job records the spooled file, the liability context and, per pipeline
+stage, its state and result, so an interrupted job can be resumed after a
+restart without repeating completed stages.
+"""
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+from sqlite_pool import get_connection as _conn
+
+# Jobs in these states are picked up again when the process restarts
+PENDING_STATUSES = ("queued", "running")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def init_jobs_table() -> None:
+    with _conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                filename TEXT,
+                file_path TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                liability_ctx TEXT NOT NULL,
+                merkle TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                stages TEXT NOT NULL DEFAULT '{}',
+                checkpoint TEXT NOT NULL DEFAULT '{}',
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+        conn.commit()
+
+
+def create_job(
+    job_id: str,
+    filename: str,
+    file_path: str,
+    file_hash: str,
+    liability_ctx: dict,
+    merkle: dict | None = None,
+) -> None:
+    now = _now()
+    with _conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO jobs
+                (id, filename, file_path, file_hash, liability_ctx, merkle,
+                 status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)
+            """,
+            (
+                job_id, filename, file_path, file_hash, json.dumps(liability_ctx),
+                json.dumps(merkle) if merkle else None, now, now,
+            ),
+        )
+        conn.commit()
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    for field in ("liability_ctx", "stages", "checkpoint"):
+        try:
+            job[field] = json.loads(job[field] or "{}")
+        except (json.JSONDecodeError, TypeError):
+            job[field] = {}
+    job["merkle"] = json.loads(job["merkle"]) if job.get("merkle") else None
+    return job
+
+
+def get_job(job_id: str) -> dict | None:
+    with _conn() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def get_pending_jobs() -> list[dict]:
+    """Return queued and interrupted jobs, oldest first."""
+    with _conn() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM jobs WHERE status IN ({','.join('?' * len(PENDING_STATUSES))}) "
+            "ORDER BY created_at ASC",
+            PENDING_STATUSES,
+        ).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+
+def set_job_status(job_id: str, status: str, error: str | None = None) -> None:
+    with _conn() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, error, _now(), job_id),
+        )
+        conn.commit()
+
+
+def record_stage(job_id: str, stage: str, state: str, result=None) -> None:
+    """Record a stage transition; completed stages also store their result."""
+    with _conn() as conn:
+        row = conn.execute(
+            "SELECT stages, checkpoint FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return
+        stages = json.loads(row[0] or "{}")
+        checkpoint = json.loads(row[1] or "{}")
+        stages[stage] = state
+        if state == "completed":
+            checkpoint[stage] = result
+        conn.execute(
+            "UPDATE jobs SET stages = ?, checkpoint = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(stages), json.dumps(checkpoint), _now(), job_id),
+        )
+        conn.commit()
@@ -0,0 +1,87 @@
+"""
+Job Runner — executes queued evidence jobs in a local worker pool.
+
+At most ``JOB_WORKERS`` jobs run concurrently; each job's stages are
+dispatched to the same bounded stage pools as synchronous uploads.
+"""
+import asyncio
+import functools
+import os
+
+from pipeline import process_evidence, run_stage
+from jobs.job_queue import (
+    PENDING_STATUSES, get_job, get_pending_jobs, record_stage, set_job_status,
+)
+
+_JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+
+_slots: asyncio.Semaphore | None = None
+_tasks: set[asyncio.Task] = set()
+_active: set[str] = set()
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(_JOB_WORKERS)
+    return _slots
+
+
+def _remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def _run_job(job_id: str) -> None:
+    async with _get_slots():
+        job = await run_stage("io", get_job, job_id)
+        if job is None or job["status"] not in PENDING_STATUSES:
+            return
+
+        if "detection" not in job["checkpoint"] and not os.path.exists(job["file_path"]):
+            await run_stage("io", set_job_status, job_id, "failed", "Spooled file is missing.")
+            return
+
+        await run_stage("io", set_job_status, job_id, "running")
+        try:
+            await process_evidence(
+                job_id,
+                job["filename"],
+                job["file_path"],
+                job["file_hash"],
+                job["liability_ctx"],
+                merkle=job["merkle"],
+                checkpoint=job["checkpoint"],
+                on_stage=functools.partial(record_stage, job_id),
+            )
+        except Exception as e:
+            print(f"[Job Runner] Job {job_id} failed: {type(e).__name__}: {e}")
+            await run_stage("io", set_job_status, job_id, "failed", f"{type(e).__name__}: {e}")
+        else:
+            await run_stage("io", set_job_status, job_id, "completed")
+        await run_stage("io", _remove_file, job["file_path"])
+
+
+def submit_job(job_id: str) -> None:
+    """Schedule a queued job on the running event loop."""
+    if job_id in _active:
+        return
+    _active.add(job_id)
+    task = asyncio.get_running_loop().create_task(_run_job(job_id))
+    _tasks.add(task)
+
+    def _done(t: asyncio.Task) -> None:
+        _tasks.discard(t)
+        _active.discard(job_id)
+
+    task.add_done_callback(_done)
+
+
+async def resume_pending_jobs() -> int:
+    """Re-submit jobs left queued or running by a previous process."""
+    jobs = await run_stage("io", get_pending_jobs)
+    for job in jobs:
+        submit_job(job["id"])
+    if jobs:
+        print(f"[Job Runner] Resuming {len(jobs)} pending job(s)")
+    return len(jobs)
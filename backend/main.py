@@ -1,7 +1,9 @@
 import os
+import re
 import uuid
 import json
-import shutil
+import base64
+import asyncio
 import tempfile
 from datetime import datetime, timezone
 from typing import Optional
@@ -10,29 +12,68 @@ from dotenv import load_dotenv
 _ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
 load_dotenv(_ENV_PATH, override=True)  # Load absolute .env
 
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Query
+from fastapi import (
+    FastAPI, Body, Depends, File, Form, Header, UploadFile, HTTPException, Query, Request, Response,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.requests import ClientDisconnect
 
-from hash_engine import hash_file
+from hash_engine import (
+    spool_and_hash, spool_upload, spool_and_merkle_hash, hash_stream,
+    hash_chunk, merkle_proof, verify_merkle_proof,
+)
 from detection.audio_detector import detect_audio
 from detection.video_detector import detect_video
 from detection.image_detector import detect_image
-from detection.gemini_detector import detect_with_gemini
-from blockchain.contract import register_evidence, verify_evidence
-from liability.scorer import compute_liability
-from legal.pdf_generator import generate_pdf
-from database import init_db, save_evidence, get_evidence, get_all_evidence
-from custody.custody_manager import (
-    init_custody_table, add_custody_event, get_custody_chain,
-    auto_register_initial_custody, VALID_ROLES,
+from archive.cold_storage import ArchiveError, init_archive_index
+from blockchain.registry_index import (
+    init_registry_index, start_receipt_watcher, verify_locally, verify_many_locally, verify_on_chain,
+)
+from database import (
+    MAX_PAGE_SIZE as EVIDENCE_MAX_PAGE_SIZE, OPTIONAL_LIST_COLUMNS,
+    LIABILITY_PARTIES, init_db, get_evidence, save_provenance,
+)
+from custody.custody_manager import init_custody_table, get_custody_chain, VALID_ROLES
+from detection.cache import init_detection_cache_table, invalidate_detection_cache
+from detection.gemini_detector import DETECTOR_NAME, detector_fingerprint
+from detection.gemini_client import metrics as gemini_metrics
+from similarity.perceptual_hash import from_hex
+from similarity.phash_index import (
+    MAX_DISTANCE as PHASH_MAX_DISTANCE, init_phash_table, get_hashes, find_near_duplicates,
+)
+from group_commit import metrics as group_commit_metrics
+from search.fts_index import (
+    MAX_PAGE_SIZE as SEARCH_MAX_PAGE_SIZE, init_search_index, search_evidence,
+)
+from stats.aggregates import MAX_DAYS as STATS_MAX_DAYS, init_stats_tables, get_stats
+from uploads.resumable import (
+    MAX_UPLOAD_LENGTH as RESUMABLE_MAX_UPLOAD_LENGTH,
+    OffsetMismatch as UploadOffsetMismatch,
+    UploadIncomplete,
+    UploadTooLarge,
+    init_upload_sessions_table,
+    create_session as create_upload_session,
+    get_session as get_upload_session,
+    append_chunk as append_upload_chunk,
+    claim_session as claim_upload_session,
+    delete_session as delete_upload_session,
+    start_session_sweeper,
 )
-from provenance.manifest import generate_manifest
-from beacon.sms_beacon import generate_beacon
+from batch import MAX_PARALLELISM as BATCH_MAX_PARALLELISM, iter_batch_entries, ingest_batch
+from pipeline import STAGES, run_stage, process_evidence, merkle_summary, issue_provenance
+import repository
+from jobs.job_queue import init_jobs_table, create_job, get_job
+from jobs.runner import submit_job, resume_pending_jobs
 
 _UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "trustchain_uploads")
 os.makedirs(_UPLOAD_DIR, exist_ok=True)
 
+# Files for async jobs must outlive the request (and a restart), so they are
+# spooled here instead of _UPLOAD_DIR.
+_JOB_DIR = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "trustchain_jobs"))
+os.makedirs(_JOB_DIR, exist_ok=True)
+
 app = FastAPI(title="TrustChain API", version="2.0.0")
 
 app.add_middleware(
@@ -44,19 +85,113 @@ app.add_middleware(
 )
 
 init_db()
+init_archive_index()
 init_custody_table()
+init_jobs_table()
+init_detection_cache_table()
+init_phash_table()
+init_upload_sessions_table()
+init_registry_index()
+init_search_index()
+init_stats_tables()
+
+
+@app.exception_handler(ArchiveError)
+async def _archive_unavailable(request, exc: ArchiveError):
+    # The record exists but its cold-storage segment cannot be read
+    print(f"[Archive] {exc}")
+    return JSONResponse(status_code=503, content={"detail": f"Archived record unavailable: {exc}"})
+
+
+@app.on_event("startup")
+async def _resume_jobs():
+    await resume_pending_jobs()
 
-_VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv"}
-_AUDIO_EXTS = {".mp3", ".wav", ".flac", ".m4a", ".ogg"}
-_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+@app.on_event("startup")
+async def _watch_registrations():
+    start_receipt_watcher()
+
+
+@app.on_event("startup")
+async def _sweep_upload_sessions():
+    start_session_sweeper()
 
 
 def _ext(filename: str) -> str:
     return os.path.splitext(filename)[1].lower()
 
 
-def _reshape_record(record: dict) -> dict:
-    """Reshape the flat DB record into the nested format the frontend expects."""
+def _stored_merkle(record: dict) -> dict | None:
+    if not record.get("merkle_root"):
+        return None
+    return {
+        "root": record["merkle_root"],
+        "chunk_size": record.get("merkle_chunk_size"),
+        "leaves": record.get("merkle_leaves") or [],
+    }
+
+
+def _merkle_view(record: dict) -> dict | None:
+    if "merkle_leaves" in record:
+        return merkle_summary(_stored_merkle(record))
+    # List rows carry only the leaf count
+    if not record.get("merkle_root"):
+        return None
+    return {
+        "root": record["merkle_root"],
+        "chunk_size": record.get("merkle_chunk_size"),
+        "chunk_count": record.get("merkle_chunk_count") or 0,
+    }
+
+
+def _stored_provenance(record: dict, detection_result: dict, fields) -> dict:
+    """
+    The manifest and beacon issued at ingest. Records from before they were
+    stored get them issued once here and saved, so later reads are stable.
+    """
+    wanted = [f for f in ("c2pa_manifest", "sms_beacon") if f in fields]
+    stored = {f: record.get(f) for f in wanted if isinstance(record.get(f), dict)}
+    if len(stored) == len(wanted):
+        return stored
+
+    issued = issue_provenance(
+        record.get("id", ""),
+        record.get("file_hash", ""),
+        record.get("detection_type", ""),
+        detection_result,
+        record.get("timestamp") or record.get("created_at"),
+    )
+    save_provenance(record["id"], issued["c2pa_manifest"], issued["sms_beacon"])
+    # Re-read so a concurrent first read cannot hand out a different copy
+    saved = get_evidence(record["id"]) or {}
+    return {f: saved.get(f) or issued[f] for f in wanted}
+
+
+# Top-level fields of a reshaped record. List views default to the cheap
+# ones; manifest, beacon and custody are built per record, so they are only
+# returned when asked for with ``fields=``.
+_RECORD_FIELDS = (
+    "id", "filename", "file_hash", "detection_type", "detection", "liability_scores",
+    "blockchain", "merkle", "c2pa_manifest", "sms_beacon", "custody_chain",
+    "pdf_download_url", "timestamp",
+)
+_LIST_FIELDS = (
+    "id", "filename", "file_hash", "detection_type", "detection", "blockchain",
+    "merkle", "pdf_download_url", "timestamp",
+)
+
+
+def _reshape_record(
+    record: dict,
+    fields: tuple | frozenset = _RECORD_FIELDS,
+    custody: list[dict] | None = None,
+) -> dict:
+    """
+    Reshape the flat DB record into the nested format the frontend expects,
+    keeping only ``fields``. ``custody`` is the record's chain when the
+    caller has already fetched it.
+    """
     detection_result = record.get("detection_result", {})
     if isinstance(detection_result, str):
         try:
@@ -75,21 +210,7 @@ def _reshape_record(record: dict) -> dict:
     evidence_id = record.get("id", "")
     file_hash = record.get("file_hash", "")
 
-    # Generate C2PA manifest
-    c2pa_manifest = generate_manifest(
-        evidence_id=evidence_id,
-        file_hash=file_hash,
-        detection_type=record.get("detection_type", ""),
-        detection_result=detection_result,
-    )
-
-    # Generate SMS beacon
-    sms_beacon = generate_beacon(evidence_id, file_hash)
-
-    # Get custody chain
-    custody = get_custody_chain(evidence_id)
-
-    return {
+    shaped = {
         "id": evidence_id,
         "filename": record.get("filename", ""),
         "file_hash": file_hash,
@@ -100,6 +221,8 @@ def _reshape_record(record: dict) -> dict:
             "label": "SYNTHETIC" if is_synthetic else "AUTHENTIC",
             "explanation": detection_result.get("explanation", ""),
             "flagged_frames": detection_result.get("flagged_frames", []),
+            "total_frames": detection_result.get("total_frames"),
+            "timeline": detection_result.get("timeline", []),
             "features": detection_result.get("features", {}),
             "model_breakdown": detection_result.get("model_breakdown", []),
             "agreement": detection_result.get("agreement", ""),
@@ -110,18 +233,52 @@ def _reshape_record(record: dict) -> dict:
             "tx_id": record.get("blockchain_tx_id", ""),
             "timestamp": record.get("timestamp", ""),
         },
-        "c2pa_manifest": c2pa_manifest,
-        "sms_beacon": sms_beacon,
-        "custody_chain": custody,
+        "merkle": _merkle_view(record),
         "pdf_download_url": f"/api/report/{evidence_id}/pdf",
         "timestamp": record.get("timestamp", ""),
     }
 
+    if "c2pa_manifest" in fields or "sms_beacon" in fields:
+        shaped.update(_stored_provenance(record, detection_result, fields))
+
+    if "custody_chain" in fields:
+        # Get custody chain
+        if custody is None:
+            custody = get_custody_chain(evidence_id)
+        shaped["custody_chain"] = custody
+
+    return {name: shaped[name] for name in _RECORD_FIELDS if name in fields}
+
+
+async def _shape_record(
+    record: dict,
+    fields: tuple | frozenset = _RECORD_FIELDS,
+    custody: list[dict] | None = None,
+) -> dict:
+    """
+    ``_reshape_record`` for async handlers. Custody chains are fetched
+    through the repository. Shaping moves to the DB pool only for the
+    records that must still issue and store their provenance.
+    """
+    if "custody_chain" in fields and custody is None:
+        custody = await repository.get_custody_chain(record["id"])
+    if any(f in fields and not isinstance(record.get(f), dict)
+           for f in ("c2pa_manifest", "sms_beacon")):
+        return await repository.run(_reshape_record, record, fields, custody)
+    return _reshape_record(record, fields, custody)
+
 
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
 
+
+@app.get("/api/metrics")
+def get_metrics():
+    """Runtime counters for the write path and the Gemini call limiter."""
+    return {"group_commit": group_commit_metrics(), "gemini": gemini_metrics()}
+
+
 @app.get("/api/debug-env")
 def debug_env():
     import os
@@ -133,9 +290,7 @@ def debug_env():
         "env_exists": os.path.exists(_ENV_PATH)
     }
 
-@app.post("/api/upload")
-async def upload_evidence(
-    file: UploadFile = File(...),
+def liability_form(
     disclosure_stripped: bool = Form(False),
     content_distributed: bool = Form(False),
     victim_impersonated: bool = Form(False),
@@ -146,177 +301,525 @@ async def upload_evidence(
     content_removed: bool = Form(False),
     estimated_reach: int = Form(0),
     model_name: str = Form("Unknown Model"),
+) -> dict:
+    """Liability context form fields shared by every ingest endpoint."""
+    return {
+        "disclosure_stripped": disclosure_stripped,
+        "content_distributed": content_distributed,
+        "victim_impersonated": victim_impersonated,
+        "repeat_offender": repeat_offender,
+        "platform_name": platform_name,
+        "takedown_requested": takedown_requested,
+        "response_hours": response_hours,
+        "content_removed": content_removed,
+        "estimated_reach": estimated_reach,
+        "model_name": model_name,
+    }
+
+
+@app.post("/api/upload")
+async def upload_evidence(
+    file: UploadFile = File(...),
+    liability_ctx: dict = Depends(liability_form),
+    merkle_mode: bool = Form(False),
+    async_job: bool = Query(False),
 ):
     event_id = str(uuid.uuid4())
     ext = _ext(file.filename or "")
-    tmp_path = os.path.join(_UPLOAD_DIR, f"{event_id}{ext}")
+    tmp_path = os.path.join(_JOB_DIR if async_job else _UPLOAD_DIR, f"{event_id}{ext}")
+
+    if async_job:
+        return await _enqueue_upload(event_id, file, tmp_path, liability_ctx, merkle_mode)
 
     try:
-        with open(tmp_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+        if merkle_mode:
+            file_hash, merkle = await run_stage("io", spool_and_merkle_hash, file.file, tmp_path)
+            source = tmp_path
+        else:
+            # Small uploads stay in memory; only large ones are written to tmp_path
+            file_hash, source = await run_stage("io", spool_upload, file.file, tmp_path)
+            merkle = None
+        return await process_evidence(
+            event_id, file.filename, source, file_hash, liability_ctx, merkle=merkle
+        )
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-        file_hash = hash_file(tmp_path)
 
-        if ext in _VIDEO_EXTS:
-            detection_type = "video"
-        elif ext in _AUDIO_EXTS:
-            detection_type = "audio"
-        elif ext in _IMAGE_EXTS:
-            detection_type = "image"
-        else:
-            detection_type = "unknown"
+@app.post("/api/upload/batch")
+async def upload_evidence_batch(
+    files: list[UploadFile] = File(...),
+    liability_ctx: dict = Depends(liability_form),
+    merkle_mode: bool = Form(False),
+    parallelism: int = Form(4, ge=1, le=BATCH_MAX_PARALLELISM),
+):
+    """
+    Ingest a device seizure in one request. ``files`` may be any mix of media
+    files and zip/tar archives; every file found is run through the full
+    pipeline and reported in a per-file manifest.
+    """
+    entries = iter_batch_entries((f.filename or "", f.file) for f in files)
+    results = await ingest_batch(
+        entries, liability_ctx, _UPLOAD_DIR, parallelism=parallelism, merkle_mode=merkle_mode
+    )
+    processed = sum(1 for r in results if r["status"] == "processed")
+    return {
+        "batch_id": str(uuid.uuid4()),
+        "total": len(results),
+        "processed": processed,
+        "failed": len(results) - processed,
+        "results": results,
+    }
 
-        # Use Gemini-powered 4-model detection for all supported types
-        if detection_type != "unknown":
-            detection_result = detect_with_gemini(tmp_path, detection_type)
-        else:
-            detection_result = {
-                "confidence": 0.0,
-                "is_synthetic": False,
-                "explanation": "Unsupported file type; no analysis performed.",
-            }
-
-        blockchain_tx_id = register_evidence(file_hash, event_id, "trustchain-user")
-
-        liability_ctx = {
-            "disclosure_stripped": disclosure_stripped,
-            "content_distributed": content_distributed,
-            "victim_impersonated": victim_impersonated,
-            "repeat_offender": repeat_offender,
-            "platform_name": platform_name,
-            "takedown_requested": takedown_requested,
-            "response_hours": response_hours,
-            "content_removed": content_removed,
-            "estimated_reach": estimated_reach,
-            "model_name": model_name,
-        }
-        liability_scores = compute_liability(liability_ctx)
-
-        timestamp = datetime.now(timezone.utc).isoformat()
-        is_synthetic = detection_result.get("is_synthetic", False)
-
-        pdf_evidence = {
-            "event_id": event_id,
-            "file_hash": file_hash,
-            "blockchain_tx_id": blockchain_tx_id,
-            "timestamp": timestamp,
-            "detection": detection_result,
-            "liability": liability_scores,
-        }
-        pdf_path = generate_pdf(pdf_evidence)
-
-        db_record = {
-            "id": event_id,
-            "filename": file.filename,
-            "file_hash": file_hash,
-            "timestamp": timestamp,
-            "detection_type": detection_type,
-            "detection_confidence": detection_result.get("confidence", 0.0),
-            "detection_result": detection_result,
-            "is_synthetic": is_synthetic,
-            "blockchain_tx_id": blockchain_tx_id,
-            "liability_scores": liability_scores,
-            "pdf_path": pdf_path,
-            "status": "processed",
-            "created_at": timestamp,
-        }
-        save_evidence(db_record)
-
-        # Auto-register initial custody
-        auto_register_initial_custody(event_id)
-
-        # Generate C2PA manifest
-        c2pa_manifest = generate_manifest(
-            evidence_id=event_id,
-            file_hash=file_hash,
-            detection_type=detection_type,
-            detection_result=detection_result,
-        )
 
-        # Generate SMS beacon
-        sms_beacon = generate_beacon(event_id, file_hash)
+def _spool(src, dest_path: str, merkle_mode: bool) -> tuple[str, dict | None]:
+    """Spool an upload to disk, returning its SHA-256 and optional Merkle tree."""
+    if merkle_mode:
+        return spool_and_merkle_hash(src, dest_path)
+    return spool_and_hash(src, dest_path), None
 
-        # Get custody chain
-        custody = get_custody_chain(event_id)
 
-        return {
-            "event_id": event_id,
-            "id": event_id,
-            "file_hash": file_hash,
-            "detection_type": detection_type,
-            "detection": {
-                "confidence": detection_result.get("confidence", 0.0),
-                "is_synthetic": is_synthetic,
-                "label": "SYNTHETIC" if is_synthetic else "AUTHENTIC",
-                "explanation": detection_result.get("explanation", ""),
-                "flagged_frames": detection_result.get("flagged_frames", []),
-                "features": detection_result.get("features", {}),
-                "model_breakdown": detection_result.get("model_breakdown", []),
-                "agreement": detection_result.get("agreement", ""),
-                "ensemble_method": detection_result.get("ensemble_method", ""),
-            },
-            "liability_scores": liability_scores,
-            "blockchain": {
-                "tx_id": blockchain_tx_id,
-                "timestamp": timestamp,
-            },
-            "c2pa_manifest": c2pa_manifest,
-            "sms_beacon": sms_beacon,
-            "custody_chain": custody,
-            "pdf_download_url": f"/api/report/{event_id}/pdf",
-            "timestamp": timestamp,
-        }
-    finally:
+async def _enqueue_upload(
+    event_id: str, file: UploadFile, tmp_path: str, liability_ctx: dict, merkle_mode: bool
+) -> JSONResponse:
+    """Persist the upload as a queued job and return 202 with its id."""
+    try:
+        file_hash, merkle = await run_stage("io", _spool, file.file, tmp_path, merkle_mode)
+    except Exception:
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
+        raise
+    return await _queue_job(event_id, file.filename, tmp_path, file_hash, liability_ctx, merkle)
+
+
+async def _queue_job(
+    event_id: str,
+    filename: str,
+    file_path: str,
+    file_hash: str,
+    liability_ctx: dict,
+    merkle: dict | None = None,
+) -> JSONResponse:
+    """Record a job for an already spooled file; the runner removes the file when done."""
+    await run_stage(
+        "io", create_job, event_id, filename, file_path, file_hash, liability_ctx, merkle
+    )
+    submit_job(event_id)
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": event_id,
+            "status": "queued",
+            "file_hash": file_hash,
+            "status_url": f"/api/jobs/{event_id}",
+        },
+    )
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Report per-stage progress for an async upload job."""
+    job = await repository.run(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result = None
+    if job["status"] == "completed":
+        record = await repository.get_evidence(job_id)
+        if record is not None:
+            result = await _shape_record(record)
+
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "filename": job["filename"],
+        "file_hash": job["file_hash"],
+        "stages": [
+            {"name": stage, "state": job["stages"].get(stage, "pending")}
+            for stage in STAGES
+        ],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "result": result,
+    }
+
+
+# ── Resumable Uploads (tus-style) ──
+
+_TUS_HEADERS = {"Tus-Resumable": "1.0.0"}
+# Received bytes are buffered up to this size before each disk write
+_PATCH_FLUSH_BYTES = 1024 * 1024
+
+
+def _parse_upload_metadata(header: str) -> dict:
+    """Parse a tus ``Upload-Metadata`` header: comma-separated ``key base64value``."""
+    metadata = {}
+    for pair in filter(None, (p.strip() for p in header.split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value).decode("utf-8") if value else ""
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail=f"Invalid Upload-Metadata for '{key}'")
+    return metadata
+
+
+def _require_session(upload_id: str) -> dict:
+    session = get_upload_session(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+@app.post("/api/uploads", status_code=201)
+def create_resumable_upload(
+    response: Response,
+    upload_length: int = Header(..., alias="Upload-Length", ge=0, le=RESUMABLE_MAX_UPLOAD_LENGTH),
+    upload_metadata: str = Header("", alias="Upload-Metadata"),
+):
+    """Open a resumable upload session of ``Upload-Length`` bytes."""
+    metadata = _parse_upload_metadata(upload_metadata)
+    upload_id = str(uuid.uuid4())
+    create_upload_session(upload_id, metadata.get("filename", ""), upload_length)
+    response.headers.update({**_TUS_HEADERS, "Location": f"/api/uploads/{upload_id}"})
+    return {"upload_id": upload_id, "upload_offset": 0, "upload_length": upload_length}
+
+
+@app.head("/api/uploads/{upload_id}")
+def get_resumable_upload_offset(upload_id: str):
+    session = _require_session(upload_id)
+    return Response(headers={
+        **_TUS_HEADERS,
+        "Upload-Offset": str(session["upload_offset"]),
+        "Upload-Length": str(session["upload_length"]),
+        "Cache-Control": "no-store",
+    })
+
+
+@app.patch("/api/uploads/{upload_id}", status_code=204)
+async def patch_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+):
+    """
+    Append the request body at ``Upload-Offset``. Bytes are hashed and stored
+    as they arrive, so a dropped connection keeps everything received so far.
+    """
+    await run_stage("io", _require_session, upload_id)
+    offset = upload_offset
+    buf = bytearray()
+    try:
+        try:
+            async for chunk in request.stream():
+                buf.extend(chunk)
+                if len(buf) >= _PATCH_FLUSH_BYTES:
+                    offset = await run_stage("io", append_upload_chunk, upload_id, offset, bytes(buf))
+                    buf.clear()
+        except ClientDisconnect:
+            # Keep whatever arrived before the connection dropped
+            if buf:
+                await run_stage("io", append_upload_chunk, upload_id, offset, bytes(buf))
+            raise
+        if buf:
+            offset = await run_stage("io", append_upload_chunk, upload_id, offset, bytes(buf))
+    except UploadOffsetMismatch as e:
+        raise HTTPException(
+            status_code=409, detail=f"Upload-Offset mismatch; server offset is {e.args[0]}"
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds Upload-Length of {e.args[0]}")
+    except KeyError:
+        # Finalized or deleted while this request was streaming
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return Response(status_code=204, headers={**_TUS_HEADERS, "Upload-Offset": str(offset)})
+
+
+@app.delete("/api/uploads/{upload_id}", status_code=204)
+def delete_resumable_upload(upload_id: str):
+    _require_session(upload_id)
+    delete_upload_session(upload_id)
+    return Response(status_code=204, headers=_TUS_HEADERS)
+
+
+@app.post("/api/uploads/{upload_id}/finalize")
+async def finalize_resumable_upload(
+    upload_id: str,
+    liability_ctx: dict = Depends(liability_form),
+    async_job: bool = Query(False),
+):
+    """Hand a completed resumable upload to the evidence pipeline."""
+    try:
+        # Claiming removes the session row, so a concurrent finalize gets 404
+        # and the file is ingested once; the spooled file now belongs to the pipeline
+        session, file_hash = await run_stage("io", claim_upload_session, upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadIncomplete as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {e.args[0]} of {e.args[1]} bytes",
+        )
+    file_path = session["file_path"]
+    filename = session["filename"] or os.path.basename(file_path)
+
+    if async_job:
+        return await _queue_job(upload_id, filename, file_path, file_hash, liability_ctx)
+
+    try:
+        return await process_evidence(upload_id, filename, file_path, file_hash, liability_ctx)
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+@app.get("/api/evidence/models")
+async def list_detection_models():
+    """Model names that can be used with ``GET /api/evidence?model=``."""
+    return {"models": await repository.get_detection_model_names()}
 
 
 @app.get("/api/evidence/{id}")
-def get_evidence_record(id: str):
-    record = get_evidence(id)
+async def get_evidence_record(id: str):
+    record, custody = await asyncio.gather(
+        repository.get_evidence(id), repository.get_custody_chain(id)
+    )
     if record is None:
         raise HTTPException(status_code=404, detail="Evidence not found")
-    return _reshape_record(record)
+    return await _shape_record(record, custody=custody)
+
+
+def _parse_fields(fields: str | None) -> tuple | frozenset:
+    if not fields:
+        return _LIST_FIELDS
+    requested = frozenset(f.strip() for f in fields.split(",") if f.strip())
+    unknown = requested.difference(_RECORD_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return requested | {"id"}
+
+
+def _utc_iso(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
 
 
 @app.get("/api/evidence")
-def list_all_evidence():
-    """Return all evidence records for the dashboard."""
-    records = get_all_evidence()
-    return [_reshape_record(r) for r in records]
+async def list_all_evidence(
+    limit: int = Query(50, ge=1, le=EVIDENCE_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    detection_type: Optional[str] = None,
+    is_synthetic: Optional[bool] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    model: Optional[str] = None,
+    model_min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    model_max_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    model_flagged: Optional[bool] = None,
+    liability_party: Optional[str] = Query(None, pattern=f"^({'|'.join(LIABILITY_PARTIES)})$"),
+    min_liability: Optional[int] = Query(None, ge=0, le=100),
+    max_liability: Optional[int] = Query(None, ge=0, le=100),
+    fields: Optional[str] = None,
+):
+    """
+    Page through evidence records, newest first. Pass the returned
+    ``next_cursor`` back as ``cursor`` for the next page. ``model`` (a
+    ``model_breakdown`` name, see ``/api/evidence/models``) filters on that
+    model's confidence and flag; ``liability_party`` with ``min_liability``/
+    ``max_liability`` filters on a party's liability percentage. ``fields`` is a
+    comma-separated list of top-level record fields; by default custody
+    chains, liability scores, manifests and beacons are left out.
+    """
+    selected = _parse_fields(fields)
+    try:
+        records, next_cursor = await repository.list_evidence(
+            limit=limit,
+            cursor=cursor,
+            detection_type=detection_type,
+            is_synthetic=is_synthetic,
+            min_confidence=min_confidence,
+            max_confidence=max_confidence,
+            created_after=_utc_iso(created_after),
+            created_before=_utc_iso(created_before),
+            model=model,
+            model_min_confidence=model_min_confidence,
+            model_max_confidence=model_max_confidence,
+            model_flagged=model_flagged,
+            liability_party=liability_party,
+            min_liability=min_liability,
+            max_liability=max_liability,
+            include_columns=tuple(c for c in OPTIONAL_LIST_COLUMNS if c in selected),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    chains = {}
+    if "custody_chain" in selected:
+        # One query for the whole page instead of one per record
+        chains = await repository.get_custody_chains([r["id"] for r in records])
+    return {
+        "items": [await _shape_record(r, selected, chains.get(r["id"])) for r in records],
+        "next_cursor": next_cursor,
+    }
+
+
+@app.get("/api/stats")
+async def get_evidence_stats(days: int = Query(30, ge=1, le=STATS_MAX_DAYS)):
+    """Dashboard totals, per-type synthetic rates and per-day volumes from the aggregate tables."""
+    return await repository.run(get_stats, days)
+
+
+@app.get("/api/evidence/{id}/similar")
+async def get_similar_evidence(id: str, max_distance: int = Query(6, ge=0, le=PHASH_MAX_DISTANCE)):
+    """Near-duplicate evidence by perceptual-hash Hamming distance."""
+    hashes = await repository.run(get_hashes, id)
+    if not hashes and await repository.get_evidence(id) is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    return {
+        "evidence_id": id,
+        "max_distance": max_distance,
+        "matches": await repository.run(find_near_duplicates, hashes, max_distance, exclude_id=id),
+    }
+
+
+@app.get("/api/similar/{phash}")
+async def search_similar(phash: str, max_distance: int = Query(6, ge=0, le=PHASH_MAX_DISTANCE)):
+    """Near-duplicate lookup for a 16-hex-digit perceptual hash."""
+    try:
+        value = from_hex(phash)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="phash must be 16 hexadecimal characters")
+    return {
+        "phash": phash.lower(),
+        "max_distance": max_distance,
+        "matches": await repository.run(find_near_duplicates, [(0, value)], max_distance),
+    }
+
+
+@app.get("/api/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+):
+    """Ranked full-text search over filenames, detection explanations and custody notes."""
+    hits, next_offset = await repository.run(search_evidence, q, limit, offset)
+    return {"query": q, "items": hits, "next_offset": next_offset}
 
 
 @app.post("/api/verify")
 async def verify_file(file: UploadFile = File(...)):
-    ext = _ext(file.filename or "")
-    tmp_path = os.path.join(_UPLOAD_DIR, f"verify_{uuid.uuid4()}{ext}")
-    try:
-        with open(tmp_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        file_hash = hash_file(tmp_path)
-        exists, block_timestamp, case_id = verify_evidence(file_hash)
-        return {
-            "file_hash": file_hash,
-            "registered_on_chain": exists,
-            "blockchain_timestamp": block_timestamp,
-            "case_id": case_id,
-        }
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+    # Verification only needs the digest, so the upload is never copied
+    file_hash = await run_stage("io", hash_stream, file.file)
+    return await _verify_hash(file_hash)
+
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_MAX_BULK_HASHES = 1000
+
+
+def _normalize_sha256(value: str) -> str:
+    file_hash = value.strip().lower()
+    if not _SHA256_RE.match(file_hash):
+        raise HTTPException(status_code=400, detail=f"Not a SHA-256 hex digest: {value!r}")
+    return file_hash
+
+
+async def _verify_hash(file_hash: str) -> dict:
+    result = await repository.run(verify_locally, file_hash)
+    if result is None:
+        result = await run_stage("chain", verify_on_chain, file_hash)
+    return result
+
+
+@app.get("/api/verify/hash/{sha256}")
+async def verify_by_hash(sha256: str):
+    """Verify a hash without uploading the file; answered from the local index when possible."""
+    return await _verify_hash(_normalize_sha256(sha256))
+
+
+@app.post("/api/verify/hashes")
+async def verify_by_hashes(hashes: list[str] = Body(..., embed=True)):
+    """Bulk verify up to 1000 hashes; only local-index misses go to the chain."""
+    if len(hashes) > _MAX_BULK_HASHES:
+        raise HTTPException(status_code=400, detail=f"At most {_MAX_BULK_HASHES} hashes per request")
+    file_hashes = list(dict.fromkeys(_normalize_sha256(h) for h in hashes))
+
+    results = await repository.run(verify_many_locally, file_hashes)
+    misses = [h for h in file_hashes if h not in results]
+    for result in await asyncio.gather(*(run_stage("chain", verify_on_chain, h) for h in misses)):
+        results[result["file_hash"]] = result
+
+    return {
+        "total": len(file_hashes),
+        "registered": sum(1 for r in results.values() if r["registered_on_chain"]),
+        "chain_lookups": len(misses),
+        "results": [results[h] for h in file_hashes],
+    }
+
+
+@app.post("/api/verify/segment/{evidence_id}")
+async def verify_segment(
+    evidence_id: str,
+    chunk_index: int = Form(...),
+    file: UploadFile = File(...),
+):
+    """
+    Verify one chunk of a Merkle-hashed evidence file without re-hashing the
+    whole file. The upload must be exactly the bytes of chunk ``chunk_index``.
+    """
+    record = await repository.get_evidence(evidence_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    merkle = _stored_merkle(record)
+    if merkle is None:
+        raise HTTPException(status_code=409, detail="Evidence was not hashed in Merkle mode")
+    leaves = merkle["leaves"]
+    if not 0 <= chunk_index < len(leaves):
+        raise HTTPException(
+            status_code=400,
+            detail=f"chunk_index must be between 0 and {len(leaves) - 1}",
+        )
+
+    data = await file.read(merkle["chunk_size"] + 1)
+    if len(data) > merkle["chunk_size"]:
+        raise HTTPException(status_code=400, detail="Segment is larger than the chunk size")
+    leaf = await run_stage("io", hash_chunk, data)
+    proof = merkle_proof(leaves, chunk_index)
+
+    return {
+        "evidence_id": evidence_id,
+        "chunk_index": chunk_index,
+        "chunk_size": merkle["chunk_size"],
+        "byte_offset": chunk_index * merkle["chunk_size"],
+        "segment_hash": leaf,
+        "expected_hash": leaves[chunk_index],
+        "merkle_root": merkle["root"],
+        "proof": proof,
+        "segment_unaltered": leaf == leaves[chunk_index]
+        and verify_merkle_proof(leaf, proof, merkle["root"]),
+        "file_hash": record.get("file_hash", ""),
+    }
 
 
 # ── Chain of Custody Endpoints ──
 
 @app.get("/api/custody/{evidence_id}")
-def get_custody(evidence_id: str):
+async def get_custody(evidence_id: str):
     """Get the full chain of custody for an evidence item."""
-    chain = get_custody_chain(evidence_id)
+    chain = await repository.get_custody_chain(evidence_id)
     return {"evidence_id": evidence_id, "chain": chain, "total_custodians": len(chain)}
 
 
 @app.post("/api/custody/{evidence_id}/transfer")
-def transfer_custody(
+async def transfer_custody(
     evidence_id: str,
     custodian_name: str = Form(...),
     custodian_role: str = Form(...),
@@ -325,7 +828,7 @@ def transfer_custody(
 ):
     """Log a custody transfer event."""
     # Verify evidence exists
-    record = get_evidence(evidence_id)
+    record = await repository.get_evidence(evidence_id)
     if record is None:
         raise HTTPException(status_code=404, detail="Evidence not found")
 
@@ -335,7 +838,7 @@ def transfer_custody(
             detail=f"Invalid role. Valid roles: {VALID_ROLES}",
         )
 
-    event = add_custody_event(
+    event = await repository.add_custody_event(
         evidence_id=evidence_id,
         custodian_name=custodian_name,
         custodian_role=custodian_role,
@@ -346,11 +849,34 @@ def transfer_custody(
     return event
 
 
+# ── Admin ──
+
+@app.delete("/api/admin/detection-cache")
+def invalidate_detection_cache_entries(
+    file_hash: Optional[str] = Query(None),
+    detector: Optional[str] = Query(None),
+    stale_only: bool = Query(False),
+):
+    """
+    Invalidate cached detection verdicts.
+
+    With ``stale_only`` only entries produced by an older model version or a
+    previous Gemini prompt or ``MODEL_DEFINITIONS`` are removed.
+    """
+    keep = None
+    if stale_only:
+        detector = detector or DETECTOR_NAME
+        _, model_version, digest = detector_fingerprint()
+        keep = (model_version, digest)
+    deleted = invalidate_detection_cache(file_hash=file_hash, detector=detector, keep=keep)
+    return {"invalidated": deleted}
+
+
 # ── Report PDF ──
 
 @app.get("/api/report/{id}/pdf")
-def download_pdf(id: str):
-    record = get_evidence(id)
+async def download_pdf(id: str):
+    record = await repository.get_evidence(id)
     if record is None:
         raise HTTPException(status_code=404, detail="Evidence not found")
     pdf_path = record.get("pdf_path")
@@ -0,0 +1,119 @@
+"""
+One-shot maintenance jobs for the TrustChain database.
+
+Usage:
+    python maintenance.py backfill-provenance [--batch-size 500] [--dry-run]
+    python maintenance.py rebuild-stats [--dry-run]
+    python maintenance.py archive [--older-than-days 180] [--max-records N] [--dry-run] [--vacuum]
+    python maintenance.py verify-archive
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"), override=True)
+
+from archive.cold_storage import (  # noqa: E402
+    ARCHIVE_AFTER_DAYS, archive_evidence, init_archive_index, verify_archive,
+)
+from custody.custody_manager import init_custody_table  # noqa: E402
+from database import get_evidence_missing_provenance, init_db, save_provenance  # noqa: E402
+from pipeline import issue_provenance  # noqa: E402
+from sqlite_pool import get_connection  # noqa: E402
+from stats.aggregates import init_stats_tables, rebuild_stats  # noqa: E402
+
+
+def backfill_provenance(batch_size: int = 500, dry_run: bool = False) -> int:
+    """
+    Issue and store the C2PA manifest and SMS beacon for every record
+    created before they were persisted at ingest. Returns the record count.
+    """
+    count = 0
+    after_id = ""
+    while True:
+        records = get_evidence_missing_provenance(after_id, batch_size)
+        if not records:
+            break
+        for record in records:
+            detection_result = record.get("detection_result")
+            issued = issue_provenance(
+                record["id"],
+                record.get("file_hash") or "",
+                record.get("detection_type") or "",
+                detection_result if isinstance(detection_result, dict) else {},
+                record.get("timestamp") or record.get("created_at"),
+            )
+            if not dry_run:
+                save_provenance(record["id"], issued["c2pa_manifest"], issued["sms_beacon"])
+        count += len(records)
+        after_id = records[-1]["id"]
+        print(f"[Maintenance] Provenance backfilled for {count} records...")
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TrustChain maintenance jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-provenance", help="store manifests and beacons for older records"
+    )
+    backfill.add_argument("--batch-size", type=int, default=500)
+    backfill.add_argument("--dry-run", action="store_true")
+
+    stats = commands.add_parser(
+        "rebuild-stats", help="recompute the dashboard aggregates and report drift"
+    )
+    stats.add_argument("--dry-run", action="store_true", help="only report drift")
+
+    archive = commands.add_parser("archive", help="move old evidence to cold-storage segments")
+    archive.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    archive.add_argument("--max-records", type=int, default=None)
+    archive.add_argument("--dry-run", action="store_true", help="only count eligible records")
+    archive.add_argument("--vacuum", action="store_true", help="compact the database afterwards")
+
+    commands.add_parser("verify-archive", help="check segments, index and stubs for consistency")
+
+    args = parser.parse_args()
+    init_db()
+    init_archive_index()
+    init_custody_table()
+    init_stats_tables()
+    if args.command == "backfill-provenance":
+        count = backfill_provenance(args.batch_size, args.dry_run)
+        verb = "would be backfilled" if args.dry_run else "backfilled"
+        print(f"[Maintenance] {count} records {verb}.")
+    elif args.command == "rebuild-stats":
+        drift = rebuild_stats(args.dry_run)
+        for line in drift:
+            print(f"[Maintenance] Drift: {line}")
+        verb = "left as is" if args.dry_run else "rebuilt"
+        print(f"[Maintenance] Stats {verb}; {len(drift)} aggregate rows differed.")
+    elif args.command == "archive":
+        summary = archive_evidence(args.older_than_days, args.max_records, args.dry_run)
+        if args.dry_run:
+            print(f"[Maintenance] {summary['records']} records would be archived.")
+            return
+        if args.vacuum and summary["records"]:
+            get_connection().execute("VACUUM")
+        print(
+            f"[Maintenance] {summary['records']} records archived into {summary['segments']} "
+            f"segments ({summary['segment_bytes']:,} bytes); "
+            f"{summary['pdf_bytes_freed']:,} bytes of PDFs freed."
+        )
+    elif args.command == "verify-archive":
+        report = verify_archive()
+        for problem in report["problems"]:
+            print(f"[Maintenance] Problem: {problem}")
+        print(
+            f"[Maintenance] {report['segments']} segments, {report['members']} members, "
+            f"{report['indexed']} index entries, {report['stubs']} stubs checked; "
+            f"{len(report['problems'])} problems."
+        )
+        if report["problems"]:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Helpers shared by the in-process metrics endpoints.
+"""
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank ``pct`` percentile of ``values``; 0.0 when there are none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
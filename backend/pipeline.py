@@ -0,0 +1,344 @@
+"""
+Evidence processing pipeline.
+
+Every stage of the upload pipeline blocks — disk I/O, Gemini polling, web3
+HTTP calls, ReportLab rendering and sqlite3 — so each one is dispatched to a
+bounded thread pool instead of running on the asyncio event loop. Pools are
+sized per stage so a burst of slow Gemini calls cannot starve chain
+registration, PDF rendering or ordinary API requests.
+"""
+import asyncio
+import functools
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable
+
+from detection.gemini_detector import detect_with_gemini, detector_fingerprint
+from detection.cache import get_cached_detection, put_cached_detection
+from blockchain.contract import register_evidence
+from blockchain.registry_index import record_pending
+from liability.scorer import compute_liability
+from legal.pdf_generator import generate_pdf
+from database import save_evidence, get_evidence
+from custody.custody_manager import auto_register_initial_custody, get_custody_chain
+from provenance.manifest import generate_manifest
+from beacon.sms_beacon import generate_beacon
+from similarity.perceptual_hash import fingerprint_media, to_hex, from_hex
+from similarity.phash_index import add_hashes, find_near_duplicates
+
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv"}
+AUDIO_EXTS = {".mp3", ".wav", ".flac", ".m4a", ".ogg"}
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+# Stage names in execution order, as reported by process_evidence(on_stage=...)
+STAGES = (
+    "fingerprint", "detection", "registration", "liability", "report", "provenance", "persist",
+)
+
+# Perceptual-hash thresholds (Hamming distance out of 64 bits)
+_PHASH_RELATED_DISTANCE = int(os.getenv("PHASH_RELATED_DISTANCE", "6"))
+_PHASH_SHORT_CIRCUIT_DISTANCE = int(os.getenv("PHASH_SHORT_CIRCUIT_DISTANCE", "4"))
+# Fraction of sampled frames that must match before a video verdict is reused
+_PHASH_SHORT_CIRCUIT_COVERAGE = float(os.getenv("PHASH_SHORT_CIRCUIT_COVERAGE", "0.5"))
+_MAX_RELATED = 10
+
+_POOL_SIZES = {
+    "io": int(os.getenv("PIPELINE_IO_WORKERS", "8")),
+    "detection": int(os.getenv("PIPELINE_DETECTION_WORKERS", "4")),
+    "chain": int(os.getenv("PIPELINE_CHAIN_WORKERS", "4")),
+    "report": int(os.getenv("PIPELINE_REPORT_WORKERS", "2")),
+}
+
+_POOLS = {
+    name: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"trustchain-{name}")
+    for name, size in _POOL_SIZES.items()
+}
+
+
+async def run_stage(pool: str, fn, *args, **kwargs):
+    """Run a blocking callable on the named stage pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_POOLS[pool], functools.partial(fn, *args, **kwargs))
+
+
+def merkle_summary(merkle: dict | None) -> dict | None:
+    """Public view of a Merkle tree: root and geometry, without the leaves."""
+    if not merkle:
+        return None
+    return {
+        "root": merkle["root"],
+        "chunk_size": merkle["chunk_size"],
+        "chunk_count": len(merkle["leaves"]),
+    }
+
+
+def media_type_for(ext: str) -> str:
+    if ext in VIDEO_EXTS:
+        return "video"
+    if ext in AUDIO_EXTS:
+        return "audio"
+    if ext in IMAGE_EXTS:
+        return "image"
+    return "unknown"
+
+
+def _fingerprint(source: str | bytes, detection_type: str, event_id: str) -> dict:
+    """Perceptual-hash the media and look up near-duplicates of earlier evidence."""
+    hashes = fingerprint_media(source, detection_type)
+    related = find_near_duplicates(hashes, _PHASH_RELATED_DISTANCE, exclude_id=event_id)
+    return {
+        "hashes": [[idx, to_hex(h)] for idx, h in hashes],
+        "related": [
+            {
+                "evidence_id": r["evidence_id"],
+                "distance": r["distance"],
+                "coverage": r["coverage"],
+                "matched_frames": len(r["matches"]),
+            }
+            for r in related[:_MAX_RELATED]
+        ],
+    }
+
+
+def _known_fake(related: list[dict]) -> tuple[dict, dict] | None:
+    """Return ``(detection_result, related_entry)`` for a close copy of a known fake."""
+    for entry in related:
+        if entry["distance"] > _PHASH_SHORT_CIRCUIT_DISTANCE:
+            break
+        if entry["coverage"] < _PHASH_SHORT_CIRCUIT_COVERAGE:
+            continue
+        record = get_evidence(entry["evidence_id"])
+        if record and record.get("is_synthetic") and isinstance(record.get("detection_result"), dict):
+            return record["detection_result"], entry
+    return None
+
+
+def _detect(
+    source: str | bytes,
+    detection_type: str,
+    file_hash: str,
+    related: list[dict],
+    mime_type: str | None = None,
+) -> tuple[dict, dict]:
+    """
+    Return ``(detection_result, cache_info)``. The exact-hash detection cache
+    is consulted first, then near-duplicates of known fakes, and only then
+    the detector itself.
+    """
+    if detection_type == "unknown":
+        result = {
+            "confidence": 0.0,
+            "is_synthetic": False,
+            "explanation": "Unsupported file type; no analysis performed.",
+        }
+        return result, {"hit": False}
+
+    detector, model_version, digest = detector_fingerprint()
+    cache_info = {"detector": detector, "model_version": model_version}
+    cached = get_cached_detection(file_hash, detector, model_version, digest)
+    if cached is not None:
+        return cached["result"], {**cache_info, "hit": True, "cached_at": cached["created_at"]}
+
+    known = _known_fake(related)
+    if known is not None:
+        result, entry = known
+        return result, {
+            **cache_info,
+            "hit": True,
+            "source": "near_duplicate",
+            "evidence_id": entry["evidence_id"],
+            "distance": entry["distance"],
+        }
+
+    # Use Gemini-powered 4-model detection for all supported types
+    result = detect_with_gemini(source, detection_type, mime_type)
+    # Mock verdicts are random, so never let them shadow a real analysis
+    if result.get("ensemble_method") != "Mock Mode":
+        put_cached_detection(file_hash, detector, model_version, digest, result)
+    return result, {**cache_info, "hit": False}
+
+
+def _register(file_hash: str, event_id: str) -> dict:
+    registration = register_evidence(file_hash, event_id, "trustchain-user")
+    registered_at = datetime.now(timezone.utc)
+    # Indexed by the receipt watcher once the transaction is mined
+    if registration["status"] == "pending":
+        record_pending(file_hash, registration["tx_id"], event_id)
+    return {
+        "tx_id": registration["tx_id"],
+        "status": registration["status"],
+        "timestamp": registered_at.isoformat(),
+    }
+
+
+def issue_provenance(
+    event_id: str,
+    file_hash: str,
+    detection_type: str,
+    detection_result: dict,
+    timestamp: str | None,
+) -> dict:
+    """
+    Issue the C2PA manifest and SMS beacon for a record, stamped with its
+    registration ``timestamp`` (ISO-8601; the current time if missing or
+    unparsable). Returns ``{"c2pa_manifest": ..., "sms_beacon": ...}``.
+    """
+    try:
+        captured_at = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        captured_at = None
+    return {
+        "c2pa_manifest": generate_manifest(
+            evidence_id=event_id,
+            file_hash=file_hash,
+            detection_type=detection_type,
+            detection_result=detection_result,
+            captured_at=captured_at,
+        ),
+        "sms_beacon": generate_beacon(event_id, file_hash, captured_at),
+    }
+
+
+def _persist(db_record: dict, phashes: list[list]) -> list[dict]:
+    save_evidence(db_record)
+    add_hashes(db_record["id"], [(idx, from_hex(h)) for idx, h in phashes])
+    # A job resumed at this stage may have registered custody before it stopped
+    chain = get_custody_chain(db_record["id"])
+    if chain:
+        return chain
+    # Auto-register initial custody
+    auto_register_initial_custody(db_record["id"])
+    return get_custody_chain(db_record["id"])
+
+
+async def process_evidence(
+    event_id: str,
+    filename: str,
+    source: str | bytes,
+    file_hash: str,
+    liability_ctx: dict,
+    merkle: dict | None = None,
+    checkpoint: dict | None = None,
+    on_stage: Callable[[str, str, object], None] | None = None,
+) -> dict:
+    """
+    Run detection, chain registration, liability scoring, PDF rendering and
+    persistence for a file that has already been spooled and hashed.
+
+    ``source`` is the path of the spooled file, or the upload's bytes when it
+    was small enough to be kept in memory.
+    ``merkle`` is the chunk-tree summary from ``spool_and_merkle_hash`` when
+    the upload was hashed in Merkle mode; its leaves are stored with the record.
+    ``checkpoint`` maps stage names in ``STAGES`` to results from an earlier,
+    interrupted run; those stages are skipped. ``on_stage(stage, state,
+    result)`` is called on the io pool as each stage starts ("running") and
+    finishes ("completed").
+
+    Returns the upload response payload.
+    """
+    done = dict(checkpoint or {})
+
+    async def stage(name: str, pool: str | None, fn, *args):
+        if name in done:
+            return done[name]
+        if on_stage:
+            await run_stage("io", on_stage, name, "running", None)
+        result = await run_stage(pool, fn, *args) if pool else fn(*args)
+        done[name] = result
+        if on_stage:
+            await run_stage("io", on_stage, name, "completed", result)
+        return result
+
+    detection_type = media_type_for(os.path.splitext(filename or "")[1].lower())
+    mime_type = mimetypes.guess_type(filename or "")[0]
+    fingerprint = await stage(
+        "fingerprint", "detection", _fingerprint, source, detection_type, event_id
+    )
+    detection_result, detection_cache = await stage(
+        "detection", "detection", _detect, source, detection_type, file_hash,
+        fingerprint["related"], mime_type,
+    )
+
+    registration = await stage("registration", "chain", _register, file_hash, event_id)
+    blockchain_tx_id = registration["tx_id"]
+    timestamp = registration["timestamp"]
+
+    liability_scores = await stage("liability", None, compute_liability, liability_ctx)
+
+    is_synthetic = detection_result.get("is_synthetic", False)
+
+    pdf_evidence = {
+        "event_id": event_id,
+        "file_hash": file_hash,
+        "blockchain_tx_id": blockchain_tx_id,
+        "timestamp": timestamp,
+        "detection": detection_result,
+        "liability": liability_scores,
+    }
+    pdf_path = await stage("report", "report", generate_pdf, pdf_evidence)
+
+    # Manifest and beacon are stored with the record, so reads serve the
+    # issued copy instead of minting new signatures and timestamps
+    provenance = await stage(
+        "provenance", None, issue_provenance,
+        event_id, file_hash, detection_type, detection_result, timestamp,
+    )
+
+    db_record = {
+        "id": event_id,
+        "filename": filename,
+        "file_hash": file_hash,
+        "timestamp": timestamp,
+        "detection_type": detection_type,
+        "detection_confidence": detection_result.get("confidence", 0.0),
+        "detection_result": detection_result,
+        "is_synthetic": is_synthetic,
+        "blockchain_tx_id": blockchain_tx_id,
+        "liability_scores": liability_scores,
+        "pdf_path": pdf_path,
+        "status": "processed",
+        "created_at": timestamp,
+        "c2pa_manifest": provenance["c2pa_manifest"],
+        "sms_beacon": provenance["sms_beacon"],
+    }
+    if merkle:
+        db_record["merkle_root"] = merkle["root"]
+        db_record["merkle_chunk_size"] = merkle["chunk_size"]
+        db_record["merkle_leaves"] = merkle["leaves"]
+    custody = await stage("persist", "io", _persist, db_record, fingerprint["hashes"])
+
+    return {
+        "event_id": event_id,
+        "id": event_id,
+        "file_hash": file_hash,
+        "detection_type": detection_type,
+        "detection": {
+            "confidence": detection_result.get("confidence", 0.0),
+            "is_synthetic": is_synthetic,
+            "label": "SYNTHETIC" if is_synthetic else "AUTHENTIC",
+            "explanation": detection_result.get("explanation", ""),
+            "flagged_frames": detection_result.get("flagged_frames", []),
+            "total_frames": detection_result.get("total_frames"),
+            "timeline": detection_result.get("timeline", []),
+            "features": detection_result.get("features", {}),
+            "model_breakdown": detection_result.get("model_breakdown", []),
+            "agreement": detection_result.get("agreement", ""),
+            "ensemble_method": detection_result.get("ensemble_method", ""),
+        },
+        "detection_cache": detection_cache,
+        "related_evidence": fingerprint["related"],
+        "liability_scores": liability_scores,
+        "blockchain": {
+            "tx_id": blockchain_tx_id,
+            "status": registration["status"],
+            "timestamp": timestamp,
+        },
+        "merkle": merkle_summary(merkle),
+        "c2pa_manifest": provenance["c2pa_manifest"],
+        "sms_beacon": provenance["sms_beacon"],
+        "custody_chain": custody,
+        "pdf_download_url": f"/api/report/{event_id}/pdf",
+        "timestamp": timestamp,
+    }
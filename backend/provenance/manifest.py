@@ -13,9 +13,16 @@ def generate_manifest(
     detection_type: str,
     detection_result: dict,
     station_id: str = "AG-PUNE-042",
+    captured_at: datetime | None = None,
 ) -> dict:
-    """Generate a C2PA-compatible provenance manifest for evidence."""
+    """
+    Generate a C2PA-compatible provenance manifest for evidence.
+
+    ``captured_at`` is when the evidence was captured (defaults to now); the
+    capture action and signature are stamped with it.
+    """
     rng = random.Random(evidence_id)  # deterministic per evidence
+    captured_at = captured_at or datetime.now(timezone.utc)
 
     ai_confidence = detection_result.get("confidence", 0.0)
     is_synthetic = detection_result.get("is_synthetic", False)
@@ -34,7 +41,7 @@ def generate_manifest(
             "c2pa.actions": [
                 {
                     "action": "c2pa.captured",
-                    "when": datetime.now(timezone.utc).isoformat(),
+                    "when": captured_at.isoformat(),
                     "softwareAgent": "TrustChain Evidence Capture",
                 }
             ],
@@ -65,7 +72,7 @@ def generate_manifest(
         "signature": {
             "algorithm": "COSE_Sign1",
             "certificate_fingerprint": f"SHA256:{secrets.token_hex(16)}",
-            "signed_at": datetime.now(timezone.utc).isoformat(),
+            "signed_at": captured_at.isoformat(),
         },
     }
 
@@ -0,0 +1,78 @@
+"""
+Async access to the evidence and custody stores for the FastAPI handlers.
+
+Reads run on a dedicated pool of ``DB_WORKERS`` threads, each with its own
+``sqlite_pool`` connection. They never wait behind uploads on the pipeline
+pools or behind other blocking endpoints on Starlette's shared threadpool.
+Writes are handed straight to the group-commit writer, and the handler
+awaits the commit future. No thread is held while the write waits for its
+batch, and the caller still only gets a response once its row has
+committed.
+
+``run`` executes any other blocking DB function on the same pool.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import group_commit
+from custody import custody_manager
+
+DB_WORKERS = int(os.getenv("DB_WORKERS", "8"))
+
+_POOL = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="trustchain-db")
+
+
+async def run(fn, *args, **kwargs):
+    """Run a blocking DB function on the DB pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_POOL, functools.partial(fn, *args, **kwargs))
+
+
+async def _write(sql: str, params: tuple) -> None:
+    if group_commit.ENABLED:
+        await asyncio.wrap_future(group_commit.submit([(sql, params)]))
+    else:
+        # Without the writer thread the commit happens on the calling thread
+        await run(group_commit.write, sql, params)
+
+
+# ── Evidence ──
+
+async def get_evidence(evidence_id: str) -> dict | None:
+    return await run(database.get_evidence, evidence_id)
+
+
+async def list_evidence(**filters) -> tuple[list[dict], str | None]:
+    return await run(database.list_evidence, **filters)
+
+
+async def get_detection_model_names() -> list[str]:
+    return await run(database.get_detection_model_names)
+
+
+# ── Custody ──
+
+async def get_custody_chain(evidence_id: str) -> list[dict]:
+    return await run(custody_manager.get_custody_chain, evidence_id)
+
+
+async def get_custody_chains(evidence_ids: list[str]) -> dict[str, list[dict]]:
+    return await run(custody_manager.get_custody_chains, evidence_ids)
+
+
+async def add_custody_event(
+    evidence_id: str,
+    custodian_name: str,
+    custodian_role: str,
+    custodian_badge: str = "",
+    action: str = "transfer",
+    notes: str = "",
+) -> dict:
+    event, statement = custody_manager.new_custody_event(
+        evidence_id, custodian_name, custodian_role, custodian_badge, action, notes
+    )
+    await _write(*statement)
+    return event
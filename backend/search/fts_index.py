@@ -0,0 +1,166 @@
+"""
+Full-text search over evidence.
+
+An FTS5 table holds one document per evidence record: its filename, the
+detection explanation and the custodian names and notes from its chain of
+custody. The document's rowid is the evidence rowid, and triggers on
+``evidence`` and ``custody_log`` rewrite it whenever either side changes,
+so the index never needs a separate sync job. Results are ranked with
+BM25, weighting filename matches highest.
+"""
+import re
+
+from database import create_triggers
+from sqlite_pool import get_connection as _conn
+
+MAX_PAGE_SIZE = 100
+
+# BM25 column weights: evidence_id (unindexed), filename, explanation, custody
+_RANK = "bm25(0.0, 4.0, 1.0, 2.0)"
+
+_EXPLANATION = (
+    "CASE WHEN json_valid({row}.detection_result) "
+    "THEN json_extract({row}.detection_result, '$.explanation') END"
+)
+_CUSTODY_TEXT = """(
+    SELECT group_concat(custodian_name || ' ' || custodian_role || ' ' || COALESCE(notes, ''), ' ')
+    FROM custody_log WHERE custody_log.evidence_id = {evidence_id}
+)"""
+
+
+def _document(row: str) -> str:
+    return (
+        f"{row}.rowid, {row}.id, {row}.filename, "
+        f"{_EXPLANATION.format(row=row)}, {_CUSTODY_TEXT.format(evidence_id=f'{row}.id')}"
+    )
+
+
+def _refresh_custody(evidence_id: str) -> str:
+    return (
+        f"UPDATE evidence_fts SET custody = {_CUSTODY_TEXT.format(evidence_id=evidence_id)} "
+        f"WHERE rowid = (SELECT rowid FROM evidence WHERE id = {evidence_id})"
+    )
+
+
+_INSERT_DOCUMENT = (
+    "INSERT INTO evidence_fts (rowid, evidence_id, filename, explanation, custody) "
+)
+
+_TRIGGERS = {
+    "trg_evidence_fts_insert": f"""
+        AFTER INSERT ON evidence BEGIN
+            {_INSERT_DOCUMENT} VALUES ({_document("NEW")});
+        END
+    """,
+    # Archiving clears detection_result; the archived record stays searchable
+    "trg_evidence_fts_update": f"""
+        AFTER UPDATE OF filename, detection_result ON evidence
+        WHEN NEW.archive_segment IS NULL BEGIN
+            DELETE FROM evidence_fts WHERE rowid = OLD.rowid;
+            {_INSERT_DOCUMENT} VALUES ({_document("NEW")});
+        END
+    """,
+    "trg_evidence_fts_delete": """
+        AFTER DELETE ON evidence BEGIN
+            DELETE FROM evidence_fts WHERE rowid = OLD.rowid;
+        END
+    """,
+    "trg_custody_fts_insert": f"""
+        AFTER INSERT ON custody_log BEGIN
+            {_refresh_custody("NEW.evidence_id")};
+        END
+    """,
+    "trg_custody_fts_update": f"""
+        AFTER UPDATE ON custody_log BEGIN
+            {_refresh_custody("OLD.evidence_id")};
+            {_refresh_custody("NEW.evidence_id")};
+        END
+    """,
+    "trg_custody_fts_delete": f"""
+        AFTER DELETE ON custody_log BEGIN
+            {_refresh_custody("OLD.evidence_id")};
+        END
+    """,
+}
+
+
+def init_search_index() -> None:
+    """
+    Create the FTS table and its triggers. Must run after ``init_db`` and
+    ``init_custody_table``; the first run indexes every existing record.
+    """
+    with _conn() as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'evidence_fts'"
+        ).fetchone()
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS evidence_fts USING fts5(
+                evidence_id UNINDEXED,
+                filename,
+                explanation,
+                custody,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """)
+        create_triggers(conn, _TRIGGERS)
+        if not exists:
+            conn.execute(f"INSERT INTO evidence_fts (evidence_fts, rank) VALUES ('rank', '{_RANK}')")
+            conn.execute(f"{_INSERT_DOCUMENT} SELECT {_document('evidence')} FROM evidence")
+            print("[Search] Full-text index built for existing evidence")
+        conn.commit()
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(text: str) -> str | None:
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix,
+    so partial filenames and words still hit. Operators in the input are
+    treated as plain text. Returns None when there is nothing to search for.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def search_evidence(text: str, limit: int = 20, offset: int = 0) -> tuple[list[dict], int | None]:
+    """
+    Return ``(hits, next_offset)`` for ``text``, best match first. Each hit
+    carries the evidence id, filename, type, verdict, BM25 score and a
+    highlighted snippet.
+    """
+    query = build_match_query(text)
+    if query is None:
+        return [], None
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    with _conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT f.evidence_id, e.filename, e.detection_type, e.is_synthetic,
+                   e.created_at, f.rank AS score,
+                   snippet(evidence_fts, -1, '<mark>', '</mark>', '…', 12) AS snippet
+            FROM evidence_fts AS f
+            JOIN evidence AS e ON e.rowid = f.rowid
+            WHERE evidence_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ? OFFSET ?
+            """,
+            (query, limit + 1, offset),
+        ).fetchall()
+    hits = [
+        {
+            "evidence_id": r["evidence_id"],
+            "filename": r["filename"],
+            "detection_type": r["detection_type"],
+            "is_synthetic": bool(r["is_synthetic"]),
+            "created_at": r["created_at"],
+            "score": round(-r["score"], 4),
+            "snippet": r["snippet"],
+        }
+        for r in rows[:limit]
+    ]
+    next_offset = offset + limit if len(rows) > limit else None
+    return hits, next_offset
@@ -0,0 +1,79 @@
+"""
+Perceptual hashing (pHash) for near-duplicate detection.
+
+A 64-bit pHash keeps the sign pattern of the lowest 8x8 DCT frequencies of a
+32x32 grayscale thumbnail, so re-encoding, resizing or mild recompression
+changes only a few bits while different content lands far away in Hamming
+distance.
+"""
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+from detection.frame_sampler import HAS_AV, iter_frames
+
+_VIDEO_SAMPLE_SECONDS = float(os.getenv("PHASH_VIDEO_SAMPLE_SECONDS", "2.0"))
+_VIDEO_MAX_FRAMES = int(os.getenv("PHASH_VIDEO_MAX_FRAMES", "30"))
+
+_THUMB_SIZE = 32
+_HASH_SIZE = 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    m[0, :] /= np.sqrt(2.0)
+    return m
+
+
+_DCT = _dct_matrix(_THUMB_SIZE)
+_BIT_WEIGHTS = 1 << np.arange(_HASH_SIZE * _HASH_SIZE - 1, -1, -1, dtype=np.uint64)
+
+
+def phash(image: Image.Image) -> int:
+    """Return the 64-bit perceptual hash of an image as an int."""
+    gray = image.convert("L").resize((_THUMB_SIZE, _THUMB_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:_HASH_SIZE, :_HASH_SIZE].ravel()
+    # The DC term only tracks overall brightness, so leave it out of the median
+    bits = low > np.median(low[1:])
+    return int(np.bitwise_or.reduce(_BIT_WEIGHTS[bits], initial=np.uint64(0)))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def from_hex(value: str) -> int:
+    if len(value) != 16:
+        raise ValueError("perceptual hash must be 16 hex characters")
+    return int(value, 16)
+
+
+def fingerprint_media(source: str | bytes, media_type: str) -> list[tuple[int, int]]:
+    """
+    Return ``(frame_index, phash)`` pairs for an image (a single frame 0) or
+    for frames sampled from a video. Other media types yield no hashes.
+    ``source`` is a file path or the bytes of an in-memory upload.
+    """
+    try:
+        if media_type == "image":
+            with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as img:
+                return [(0, phash(img))]
+        if media_type == "video" and HAS_AV:
+            return [
+                (index, phash(img))
+                for index, _, img in iter_frames(
+                    source, every_seconds=_VIDEO_SAMPLE_SECONDS, max_frames=_VIDEO_MAX_FRAMES
+                )
+            ]
+    except Exception as e:
+        print(f"[Perceptual Hash] Could not fingerprint {media_type}: {type(e).__name__}: {e}")
+    return []
@@ -0,0 +1,181 @@
+"""
+Near-duplicate index over perceptual hashes.
+
+Hashes are persisted in the ``perceptual_hashes`` table next to ``evidence``
+and served from an in-memory multi-index hash: each 64-bit hash is split
+into four 16-bit substrings, each with its own bucket table. By the
+pigeonhole principle, any hash within distance ``r`` matches at least one
+substring within ``r // 4``, so a lookup only probes those neighbouring
+buckets and verifies the few candidates found there, instead of scanning
+every stored hash.
+
+Each process keeps its own index, and SQLite is the only shared copy. Rows
+are never deleted, so rowids only grow; before every lookup the index
+catches up on rows past the last rowid it loaded. A hash stored by another
+worker is therefore visible to the next search here, and rows that
+``INSERT OR IGNORE`` skipped are never indexed twice.
+"""
+import itertools
+import threading
+from functools import lru_cache
+
+from similarity.perceptual_hash import hamming, to_hex, from_hex
+from sqlite_pool import get_connection as _conn
+
+_SUBSTRINGS = 4
+_SUBSTRING_BITS = 64 // _SUBSTRINGS
+_SUBSTRING_MASK = (1 << _SUBSTRING_BITS) - 1
+
+# Largest supported query radius; probes grow combinatorially beyond this
+MAX_DISTANCE = 16
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> tuple[int, ...]:
+    """All 16-bit masks with at most ``radius`` bits set."""
+    masks = []
+    for r in range(radius + 1):
+        for bits in itertools.combinations(range(_SUBSTRING_BITS), r):
+            mask = 0
+            for bit in bits:
+                mask |= 1 << bit
+            masks.append(mask)
+    return tuple(masks)
+
+
+class MultiIndexHash:
+    """Multi-index hash table for Hamming-radius search over 64-bit hashes."""
+
+    def __init__(self):
+        self._hashes: list[int] = []
+        self._items: list = []
+        self._tables: list[dict[int, list[int]]] = [{} for _ in range(_SUBSTRINGS)]
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @staticmethod
+    def _substrings(value: int):
+        for i in range(_SUBSTRINGS):
+            yield i, (value >> (i * _SUBSTRING_BITS)) & _SUBSTRING_MASK
+
+    def add(self, value: int, item) -> None:
+        slot = len(self._hashes)
+        self._hashes.append(value)
+        self._items.append(item)
+        for i, sub in self._substrings(value):
+            self._tables[i].setdefault(sub, []).append(slot)
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, object]]:
+        """Return ``(distance, item)`` for every item within ``max_distance``."""
+        if max_distance > MAX_DISTANCE:
+            raise ValueError(f"max_distance must be at most {MAX_DISTANCE}")
+        masks = _flip_masks(max_distance // _SUBSTRINGS)
+        seen: set[int] = set()
+        matches = []
+        for i, sub in self._substrings(value):
+            table = self._tables[i]
+            for mask in masks:
+                for slot in table.get(sub ^ mask, ()):
+                    if slot in seen:
+                        continue
+                    seen.add(slot)
+                    d = hamming(value, self._hashes[slot])
+                    if d <= max_distance:
+                        matches.append((d, self._items[slot]))
+        return matches
+
+
+_index: MultiIndexHash | None = None
+_index_lock = threading.Lock()
+# Highest perceptual_hashes rowid already in _index
+_synced_rowid = 0
+
+
+def init_phash_table() -> None:
+    with _conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS perceptual_hashes (
+                evidence_id TEXT NOT NULL,
+                frame_index INTEGER NOT NULL,
+                phash TEXT NOT NULL,
+                PRIMARY KEY (evidence_id, frame_index),
+                FOREIGN KEY (evidence_id) REFERENCES evidence(id)
+            )
+        """)
+        conn.commit()
+
+
+def _sync_index() -> MultiIndexHash:
+    """Add rows stored since the last sync, by any process. Call with ``_index_lock`` held."""
+    global _index, _synced_rowid
+    if _index is None:
+        _index = MultiIndexHash()
+    with _conn() as conn:
+        rows = conn.execute(
+            "SELECT rowid, evidence_id, frame_index, phash FROM perceptual_hashes "
+            "WHERE rowid > ? ORDER BY rowid",
+            (_synced_rowid,),
+        ).fetchall()
+    for rowid, evidence_id, frame_index, value in rows:
+        _index.add(from_hex(value), (evidence_id, frame_index))
+        _synced_rowid = rowid
+    return _index
+
+
+def add_hashes(evidence_id: str, hashes: list[tuple[int, int]]) -> None:
+    """Persist ``(frame_index, phash)`` pairs for an evidence item and index the new ones."""
+    if not hashes:
+        return
+    with _conn() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO perceptual_hashes (evidence_id, frame_index, phash) "
+            "VALUES (?, ?, ?)",
+            [(evidence_id, idx, to_hex(h)) for idx, h in hashes],
+        )
+        conn.commit()
+    with _index_lock:
+        _sync_index()
+
+
+def get_hashes(evidence_id: str) -> list[tuple[int, int]]:
+    with _conn() as conn:
+        rows = conn.execute(
+            "SELECT frame_index, phash FROM perceptual_hashes "
+            "WHERE evidence_id = ? ORDER BY frame_index",
+            (evidence_id,),
+        ).fetchall()
+    return [(idx, from_hex(h)) for idx, h in rows]
+
+
+def find_near_duplicates(
+    hashes: list[tuple[int, int]],
+    max_distance: int,
+    exclude_id: str | None = None,
+) -> list[dict]:
+    """
+    Return evidence items with at least one hash within ``max_distance`` of
+    any of ``hashes``, closest first. Each result carries the best distance,
+    the matched frame pairs and ``coverage``, the fraction of query frames
+    that matched.
+    """
+    best: dict[str, dict] = {}
+    with _index_lock:
+        index = _sync_index()
+        for query_idx, value in hashes:
+            for distance, (evidence_id, frame_index) in index.search(value, max_distance):
+                if evidence_id == exclude_id:
+                    continue
+                entry = best.setdefault(
+                    evidence_id, {"evidence_id": evidence_id, "distance": distance, "matches": []}
+                )
+                entry["distance"] = min(entry["distance"], distance)
+                entry["matches"].append({
+                    "query_frame": query_idx,
+                    "frame_index": frame_index,
+                    "distance": distance,
+                })
+    for entry in best.values():
+        matched = {m["query_frame"] for m in entry["matches"]}
+        entry["coverage"] = round(len(matched) / len(hashes), 4)
+    return sorted(best.values(), key=lambda e: (e["distance"], -e["coverage"]))
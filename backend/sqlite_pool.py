@@ -0,0 +1,66 @@
+"""
+Shared SQLite connection layer.
+
+Every thread gets one long-lived connection to ``DB_PATH``, opened on first
+use and reused for every query that thread runs afterwards. The stage pools
+in ``pipeline`` and FastAPI's sync-endpoint threads are long-lived, so in
+practice a handful of connections serve every request. Each connection keeps
+its own prepared-statement cache (``cached_statements``), which only pays
+off because the connection outlives a single call.
+
+The database runs in WAL mode, so readers never block the writer and vice
+versa; ``busy_timeout`` absorbs the brief waits between concurrent writers.
+
+Connections use ``sqlite3.Row`` rows, which index like tuples and convert
+with ``dict(row)``. ``with get_connection() as conn:`` scopes a transaction
+(commit on success, rollback on error); it does not close the connection.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+
+DB_PATH = os.getenv("DB_PATH", os.path.join(tempfile.gettempdir(), "trustchain.db"))
+
+_CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+# Negative cache_size is in KiB, per connection
+_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# NORMAL is durable across application crashes in WAL mode; only an OS
+# crash or power loss can roll back the most recent commits.
+_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+_local = threading.local()
+
+
+def _open() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=_CACHED_STATEMENTS,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _open()
+    return conn
+
+
+def close_connection() -> None:
+    """Close this thread's connection; the next ``get_connection`` reopens it."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
@@ -0,0 +1,258 @@
+"""
+Dashboard statistics, maintained incrementally.
+
+Three small aggregate tables hold running counts:
+
+* ``stats_totals``: one row per media type, holding record, synthetic and
+  anchored-beacon counts plus a confidence sum for averaging.
+* ``stats_daily``: one row per (UTC day, media type), holding record and
+  synthetic counts.
+* ``stats_custody``: custody events per action.
+
+Triggers on ``evidence`` and ``custody_log`` apply each insert, update and
+delete as a delta in the same transaction as the write. ``save_evidence``
+and ``add_custody_event`` therefore keep the aggregates exact without any
+extra code, and ``get_stats`` reads a few rows however large the tables
+grow. ``rebuild_stats`` recomputes everything from the source tables and
+reports any drift it found.
+"""
+from database import create_triggers
+from sqlite_pool import get_connection as _conn
+
+MAX_DAYS = 366
+
+_TYPE = "COALESCE({row}.detection_type, 'unknown')"
+_SYNTHETIC = "(CASE WHEN {row}.is_synthetic THEN 1 ELSE 0 END)"
+_ANCHORED = (
+    "(CASE WHEN json_valid({row}.sms_beacon) "
+    "AND json_extract({row}.sms_beacon, '$.status') = 'ANCHORED' THEN 1 ELSE 0 END)"
+)
+_DAY = "substr({row}.created_at, 1, 10)"
+
+_TABLES = {
+    "stats_totals": """
+        detection_type TEXT PRIMARY KEY,
+        total INTEGER NOT NULL,
+        synthetic INTEGER NOT NULL,
+        confidence_sum REAL NOT NULL,
+        confidence_count INTEGER NOT NULL,
+        beacon_anchored INTEGER NOT NULL
+    """,
+    "stats_daily": """
+        day TEXT NOT NULL,
+        detection_type TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        synthetic INTEGER NOT NULL,
+        PRIMARY KEY (day, detection_type)
+    """,
+    "stats_custody": """
+        action TEXT PRIMARY KEY,
+        events INTEGER NOT NULL
+    """,
+}
+
+
+def _apply_evidence(row: str, sign: int) -> str:
+    """Statements adding (sign=1) or removing (sign=-1) one evidence row."""
+    t, s = _TYPE.format(row=row), _SYNTHETIC.format(row=row)
+    return f"""
+        INSERT INTO stats_totals
+            (detection_type, total, synthetic, confidence_sum, confidence_count, beacon_anchored)
+        VALUES (
+            {t}, {sign}, {sign} * {s},
+            {sign} * COALESCE({row}.detection_confidence, 0),
+            {sign} * ({row}.detection_confidence IS NOT NULL),
+            {sign} * {_ANCHORED.format(row=row)}
+        )
+        ON CONFLICT (detection_type) DO UPDATE SET
+            total = total + excluded.total,
+            synthetic = synthetic + excluded.synthetic,
+            confidence_sum = confidence_sum + excluded.confidence_sum,
+            confidence_count = confidence_count + excluded.confidence_count,
+            beacon_anchored = beacon_anchored + excluded.beacon_anchored;
+        INSERT INTO stats_daily (day, detection_type, total, synthetic)
+        VALUES ({_DAY.format(row=row)}, {t}, {sign}, {sign} * {s})
+        ON CONFLICT (day, detection_type) DO UPDATE SET
+            total = total + excluded.total,
+            synthetic = synthetic + excluded.synthetic;
+    """
+
+
+def _apply_custody(row: str, sign: int) -> str:
+    return f"""
+        INSERT INTO stats_custody (action, events) VALUES ({row}.action, {sign})
+        ON CONFLICT (action) DO UPDATE SET events = events + excluded.events;
+    """
+
+
+_TRIGGERS = {
+    "trg_stats_evidence_insert": f"""
+        AFTER INSERT ON evidence BEGIN {_apply_evidence("NEW", 1)} END
+    """,
+    "trg_stats_evidence_update": f"""
+        AFTER UPDATE OF detection_type, is_synthetic, detection_confidence, created_at, sms_beacon
+        ON evidence BEGIN {_apply_evidence("OLD", -1)} {_apply_evidence("NEW", 1)} END
+    """,
+    "trg_stats_evidence_delete": f"""
+        AFTER DELETE ON evidence BEGIN {_apply_evidence("OLD", -1)} END
+    """,
+    "trg_stats_custody_insert": f"""
+        AFTER INSERT ON custody_log BEGIN {_apply_custody("NEW", 1)} END
+    """,
+    "trg_stats_custody_update": f"""
+        AFTER UPDATE OF action ON custody_log
+        BEGIN {_apply_custody("OLD", -1)} {_apply_custody("NEW", 1)} END
+    """,
+    "trg_stats_custody_delete": f"""
+        AFTER DELETE ON custody_log BEGIN {_apply_custody("OLD", -1)} END
+    """,
+}
+
+_REBUILD = (
+    "DELETE FROM stats_totals",
+    "DELETE FROM stats_daily",
+    "DELETE FROM stats_custody",
+    f"""
+    INSERT INTO stats_totals
+        (detection_type, total, synthetic, confidence_sum, confidence_count, beacon_anchored)
+    SELECT {_TYPE.format(row="evidence")}, COUNT(*), SUM({_SYNTHETIC.format(row="evidence")}),
+           COALESCE(SUM(detection_confidence), 0), COUNT(detection_confidence),
+           SUM({_ANCHORED.format(row="evidence")})
+    FROM evidence GROUP BY 1
+    """,
+    f"""
+    INSERT INTO stats_daily (day, detection_type, total, synthetic)
+    SELECT {_DAY.format(row="evidence")}, {_TYPE.format(row="evidence")},
+           COUNT(*), SUM({_SYNTHETIC.format(row="evidence")})
+    FROM evidence GROUP BY 1, 2
+    """,
+    "INSERT INTO stats_custody (action, events) SELECT action, COUNT(*) FROM custody_log GROUP BY 1",
+)
+
+# Primary-key width of each table, for comparing snapshots
+_KEYS = {"stats_totals": 1, "stats_daily": 2, "stats_custody": 1}
+
+
+def init_stats_tables() -> None:
+    """
+    Create the aggregate tables and their triggers. Must run after
+    ``init_db`` and ``init_custody_table``; the first run fills the
+    aggregates from the existing rows.
+    """
+    with _conn() as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_totals'"
+        ).fetchone()
+        for name, columns in _TABLES.items():
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({columns}) WITHOUT ROWID")
+        create_triggers(conn, _TRIGGERS)
+        if not exists:
+            for sql in _REBUILD:
+                conn.execute(sql)
+            print("[Stats] Aggregates built from existing evidence")
+        conn.commit()
+
+
+def _snapshot(conn) -> dict:
+    snapshot = {}
+    for table, width in _KEYS.items():
+        for row in conn.execute(f"SELECT * FROM {table}"):
+            values = tuple(round(v, 6) if isinstance(v, float) else v for v in row[width:])
+            # Rows that have been counted back down to zero carry no information
+            if any(values):
+                snapshot[(table, *row[:width])] = values
+    return snapshot
+
+
+def rebuild_stats(dry_run: bool = False) -> list[str]:
+    """
+    Recompute every aggregate from ``evidence`` and ``custody_log``. Returns
+    a line per aggregate row that differed from the maintained value; with
+    ``dry_run`` the maintained values are left as they were.
+    """
+    conn = _conn()
+    try:
+        # IMMEDIATE so no write lands between the snapshot and the rebuild
+        conn.execute("BEGIN IMMEDIATE")
+        before = _snapshot(conn)
+        for sql in _REBUILD:
+            conn.execute(sql)
+        after = _snapshot(conn)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [
+        f"{' / '.join(map(str, key))}: maintained {before.get(key)}, actual {after.get(key)}"
+        for key in sorted(before.keys() | after.keys(), key=str)
+        if before.get(key) != after.get(key)
+    ]
+
+
+def _summary(total: int, synthetic: int, confidence_sum: float, confidence_count: int) -> dict:
+    return {
+        "total": total,
+        "synthetic": synthetic,
+        "authentic": total - synthetic,
+        "synthetic_rate": round(synthetic / total, 4) if total else 0.0,
+        "average_confidence": round(confidence_sum / confidence_count, 4) if confidence_count else None,
+    }
+
+
+def get_stats(days: int = 30) -> dict:
+    """
+    Totals overall and per media type, custody event counts, and per-day
+    volumes for the ``days`` most recent UTC days that have records.
+    """
+    days = max(1, min(days, MAX_DAYS))
+    with _conn() as conn:
+        totals = conn.execute("SELECT * FROM stats_totals WHERE total > 0").fetchall()
+        daily = conn.execute(
+            """
+            SELECT day, detection_type, total, synthetic FROM stats_daily
+            WHERE day IN (
+                SELECT DISTINCT day FROM stats_daily WHERE total > 0
+                ORDER BY day DESC LIMIT ?
+            ) AND total > 0
+            ORDER BY day
+            """,
+            (days,),
+        ).fetchall()
+        custody = conn.execute(
+            "SELECT action, events FROM stats_custody WHERE events > 0 ORDER BY action"
+        ).fetchall()
+
+    by_type = {
+        r["detection_type"]: {
+            **_summary(r["total"], r["synthetic"], r["confidence_sum"], r["confidence_count"]),
+            "beacon_anchored": r["beacon_anchored"],
+        }
+        for r in totals
+    }
+    overall = _summary(
+        sum(r["total"] for r in totals),
+        sum(r["synthetic"] for r in totals),
+        sum(r["confidence_sum"] for r in totals),
+        sum(r["confidence_count"] for r in totals),
+    )
+    overall["beacon_anchored"] = sum(r["beacon_anchored"] for r in totals)
+
+    per_day: dict[str, dict] = {}
+    for r in daily:
+        day = per_day.setdefault(r["day"], {"day": r["day"], "total": 0, "synthetic": 0, "by_type": {}})
+        day["total"] += r["total"]
+        day["synthetic"] += r["synthetic"]
+        day["by_type"][r["detection_type"]] = {"total": r["total"], "synthetic": r["synthetic"]}
+
+    return {
+        **overall,
+        "by_type": by_type,
+        "daily": list(per_day.values()),
+        "custody_events": {
+            "total": sum(r["events"] for r in custody),
+            "by_action": {r["action"]: r["events"] for r in custody},
+        },
+    }
@@ -0,0 +1,279 @@
+"""
+Resumable Uploads — tus-style create / PATCH at offset / finalize sessions.
+
+Session metadata lives in SQLite and received bytes in a per-session file,
+so an interrupted upload resumes from the last stored offset. The SHA-256 is
+updated as each chunk is written, so it is ready at finalize without
+re-reading the file. Hash state cannot be persisted, so after a restart it
+is rebuilt once from the bytes already on disk.
+
+Each session has a lock held across the offset check, the write, the hash
+update and the offset commit. A client retrying a PATCH while its first
+attempt is still streaming therefore gets an offset mismatch instead of
+writing the same range twice into the file and the running hash.
+Finalizing claims the session by deleting its row, so only one caller can
+hand a completed upload to the pipeline.
+
+Sessions untouched for ``RESUMABLE_SESSION_TTL_S`` are abandoned; a
+background sweep removes their rows and partial files.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlite_pool import get_connection as _conn
+
+RESUMABLE_DIR = os.getenv(
+    "RESUMABLE_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "trustchain_resumable")
+)
+os.makedirs(RESUMABLE_DIR, exist_ok=True)
+
+MAX_UPLOAD_LENGTH = int(os.getenv("RESUMABLE_MAX_UPLOAD_LENGTH", str(64 * 1024 ** 3)))
+SESSION_TTL_S = float(os.getenv("RESUMABLE_SESSION_TTL_S", str(24 * 3600)))
+SWEEP_INTERVAL_S = float(os.getenv("RESUMABLE_SWEEP_INTERVAL_S", "3600"))
+
+# upload_id -> (sha256 object, number of bytes it has consumed)
+_hashers: dict[str, tuple] = {}
+_hashers_lock = threading.Lock()
+# upload_id -> lock serialising appends, finalize and delete for that session
+_session_locks: dict[str, threading.Lock] = {}
+
+_sweeper: threading.Thread | None = None
+_sweeper_lock = threading.Lock()
+
+
+class OffsetMismatch(Exception):
+    """The client's Upload-Offset does not match the bytes stored so far."""
+
+
+class UploadTooLarge(Exception):
+    """A chunk would take the upload past its declared Upload-Length."""
+
+
+class UploadIncomplete(Exception):
+    """Finalize was called before all Upload-Length bytes were stored."""
+
+
+def _session_lock(upload_id: str) -> threading.Lock:
+    with _hashers_lock:
+        return _session_locks.setdefault(upload_id, threading.Lock())
+
+
+def _forget(upload_id: str) -> None:
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+        _session_locks.pop(upload_id, None)
+
+
+def _missing(upload_id: str) -> KeyError:
+    # Ids are never reused, so a session that is gone stays gone and its
+    # lock can go too; otherwise every request for an unknown id leaves one
+    _forget(upload_id)
+    return KeyError(upload_id)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def init_upload_sessions_table() -> None:
+    with _conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT,
+                upload_length INTEGER NOT NULL,
+                upload_offset INTEGER NOT NULL DEFAULT 0,
+                file_path TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        conn.commit()
+
+
+def create_session(upload_id: str, filename: str, upload_length: int) -> dict:
+    ext = os.path.splitext(filename or "")[1].lower()
+    file_path = os.path.join(RESUMABLE_DIR, f"{upload_id}{ext}")
+    open(file_path, "wb").close()
+    now = _now()
+    with _conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO upload_sessions
+                (id, filename, upload_length, upload_offset, file_path, created_at, updated_at)
+            VALUES (?, ?, ?, 0, ?, ?, ?)
+            """,
+            (upload_id, filename, upload_length, file_path, now, now),
+        )
+        conn.commit()
+    with _hashers_lock:
+        _hashers[upload_id] = (hashlib.sha256(), 0)
+    return get_session(upload_id)
+
+
+def get_session(upload_id: str) -> dict | None:
+    with _conn() as conn:
+        row = conn.execute(
+            "SELECT * FROM upload_sessions WHERE id = ?", (upload_id,)
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def _hasher_for(session: dict):
+    """Return a hasher that has consumed exactly the stored bytes of ``session``."""
+    upload_id = session["id"]
+    offset = session["upload_offset"]
+    with _hashers_lock:
+        entry = _hashers.get(upload_id)
+    if entry is not None and entry[1] == offset:
+        return entry[0]
+
+    sha256 = hashlib.sha256()
+    with open(session["file_path"], "rb") as f:
+        remaining = offset
+        while remaining:
+            chunk = f.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            sha256.update(chunk)
+            remaining -= len(chunk)
+    with _hashers_lock:
+        _hashers[upload_id] = (sha256, offset)
+    return sha256
+
+
+def append_chunk(upload_id: str, offset: int, data: bytes) -> int:
+    """
+    Write ``data`` at ``offset`` and fold it into the running hash.
+
+    Returns the new offset. Raises ``OffsetMismatch`` or ``UploadTooLarge``,
+    and ``KeyError`` if the session is gone.
+    """
+    with _session_lock(upload_id):
+        session = get_session(upload_id)
+        if session is None:
+            raise _missing(upload_id)
+        if offset != session["upload_offset"]:
+            raise OffsetMismatch(session["upload_offset"])
+        new_offset = offset + len(data)
+        if new_offset > session["upload_length"]:
+            raise UploadTooLarge(session["upload_length"])
+
+        sha256 = _hasher_for(session)
+        with open(session["file_path"], "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+            # Drop any bytes left past the offset by an earlier, unacknowledged write
+            f.truncate()
+
+        with _conn() as conn:
+            # Compare-and-set on the offset guards against writers outside this process
+            claimed = conn.execute(
+                """
+                UPDATE upload_sessions SET upload_offset = ?, updated_at = ?
+                WHERE id = ? AND upload_offset = ?
+                """,
+                (new_offset, _now(), upload_id, offset),
+            ).rowcount
+            conn.commit()
+        if not claimed:
+            with _hashers_lock:
+                _hashers.pop(upload_id, None)
+            current = get_session(upload_id)
+            if current is None:
+                raise _missing(upload_id)
+            raise OffsetMismatch(current["upload_offset"])
+
+        sha256.update(data)
+        with _hashers_lock:
+            _hashers[upload_id] = (sha256, new_offset)
+        return new_offset
+
+
+def claim_session(upload_id: str) -> tuple[dict, str]:
+    """
+    Take a completed upload out of the session table for ingest, returning
+    the session and the SHA-256 of its file. The file is left in place for
+    the caller. Only one caller can claim a session; the others get
+    ``KeyError`` as if it had never existed. Raises ``UploadIncomplete``
+    while bytes are still missing.
+    """
+    with _session_lock(upload_id):
+        session = get_session(upload_id)
+        if session is None:
+            raise _missing(upload_id)
+        if session["upload_offset"] != session["upload_length"]:
+            raise UploadIncomplete(session["upload_offset"], session["upload_length"])
+        file_hash = _hasher_for(session).hexdigest()
+        with _conn() as conn:
+            claimed = conn.execute(
+                "DELETE FROM upload_sessions WHERE id = ? AND upload_offset = upload_length",
+                (upload_id,),
+            ).rowcount
+            conn.commit()
+        if not claimed:
+            raise _missing(upload_id)
+    _forget(upload_id)
+    return session, file_hash
+
+
+def delete_session(upload_id: str, remove_file: bool = True) -> None:
+    with _session_lock(upload_id):
+        session = get_session(upload_id)
+        with _conn() as conn:
+            conn.execute("DELETE FROM upload_sessions WHERE id = ?", (upload_id,))
+            conn.commit()
+        if remove_file and session and os.path.exists(session["file_path"]):
+            os.remove(session["file_path"])
+    _forget(upload_id)
+
+
+def expire_sessions(max_age_s: float = SESSION_TTL_S) -> int:
+    """Remove sessions not written to for ``max_age_s`` seconds, with their files."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=max_age_s)).isoformat()
+    with _conn() as conn:
+        stale = [
+            row["id"] for row in conn.execute(
+                "SELECT id FROM upload_sessions WHERE updated_at < ?", (cutoff,)
+            ).fetchall()
+        ]
+
+    expired = 0
+    for upload_id in stale:
+        with _session_lock(upload_id):
+            session = get_session(upload_id)
+            # Skip sessions claimed or resumed since the scan
+            if session is None or session["updated_at"] >= cutoff:
+                continue
+            with _conn() as conn:
+                conn.execute("DELETE FROM upload_sessions WHERE id = ?", (upload_id,))
+                conn.commit()
+            if os.path.exists(session["file_path"]):
+                os.remove(session["file_path"])
+        _forget(upload_id)
+        expired += 1
+    return expired
+
+
+def _sweep_sessions() -> None:
+    while True:
+        try:
+            expired = expire_sessions()
+            if expired:
+                print(f"[Resumable] Removed {expired} abandoned upload session(s)")
+        except Exception as e:
+            print(f"[Resumable] Session sweep failed: {type(e).__name__}: {e}")
+        time.sleep(SWEEP_INTERVAL_S)
+
+
+def start_session_sweeper() -> None:
+    """Start the background thread that expires abandoned sessions."""
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = threading.Thread(target=_sweep_sessions, name="resumable-sweeper", daemon=True)
+            _sweeper.start()
@@ -26,20 +26,63 @@ function StatusDot({ synthetic }: { synthetic: boolean }) {
     )
 }
 
+// List fields the dashboard renders; custody chains are left to the results page
+const LIST_FIELDS = 'id,filename,detection_type,detection,c2pa_manifest,sms_beacon,timestamp'
+const PAGE_SIZE = 50
+
 export default function Dashboard() {
     const [records, setRecords] = useState<any[]>([])
     const [loading, setLoading] = useState(true)
+    const [loadingMore, setLoadingMore] = useState(false)
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
     const [filter, setFilter] = useState<'all' | 'video' | 'audio'>('all')
+    const [stats, setStats] = useState<any>(null)
+
+    const fetchPage = (cursor: string | null) =>
+        axios.get('/api/evidence', {
+            params: {
+                limit: PAGE_SIZE,
+                fields: LIST_FIELDS,
+                ...(cursor ? { cursor } : {}),
+                ...(filter === 'all' ? {} : { detection_type: filter }),
+            },
+        })
 
     useEffect(() => {
-        axios
-            .get('/api/evidence')
-            .then((res) => setRecords(res.data))
-            .catch(() => setRecords([]))
+        setLoading(true)
+        fetchPage(null)
+            .then((res) => {
+                setRecords(res.data.items)
+                setNextCursor(res.data.next_cursor)
+            })
+            .catch(() => {
+                setRecords([])
+                setNextCursor(null)
+            })
             .finally(() => setLoading(false))
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [filter])
+
+    // Counts come from the server-side aggregates, not from the loaded page
+    useEffect(() => {
+        axios.get('/api/stats')
+            .then((res) => setStats(res.data))
+            .catch(() => setStats(null))
     }, [])
 
-    const filtered = filter === 'all' ? records : records.filter((r: any) => r.detection_type === filter)
+    const summary = stats ? (filter === 'all' ? stats : stats.by_type[filter]) : null
+
+    const loadMore = () => {
+        if (!nextCursor) return
+        setLoadingMore(true)
+        fetchPage(nextCursor)
+            .then((res) => {
+                setRecords((prev) => [...prev, ...res.data.items])
+                setNextCursor(res.data.next_cursor)
+            })
+            .catch(() => setNextCursor(null))
+            .finally(() => setLoadingMore(false))
+    }
 
     return (
         <div>
@@ -76,7 +119,7 @@ export default function Dashboard() {
                         Loading…
                     </div>
                 </div>
-            ) : filtered.length === 0 ? (
+            ) : records.length === 0 ? (
                 <div className="text-center py-24 animate-enter">
                     <p className="text-[--text-dim] text-sm mb-4">No evidence records found.</p>
                     <Link to="/upload" className="btn-glow">
@@ -94,7 +137,7 @@ export default function Dashboard() {
                         <div className="col-span-2">Date</div>
                     </div>
 
-                    {filtered.map((record: any) => {
+                    {records.map((record: any) => {
                         const detection = record.detection || {}
                         const tier = record.c2pa_manifest?.trust_tier?.level || 'TIER_3'
                         const isSynthetic = detection.is_synthetic
@@ -134,32 +177,44 @@ export default function Dashboard() {
                             </Link>
                         )
                     })}
+
+                    {nextCursor && (
+                        <div className="flex justify-center pt-4">
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="px-4 py-2 text-sm font-medium rounded-full text-[--text-secondary] hover:text-[--text] bg-[--surface-2] border border-[--border-subtle] transition-all disabled:opacity-50"
+                            >
+                                {loadingMore ? 'Loading…' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
             {/* Stats */}
-            {!loading && records.length > 0 && (
+            {!loading && summary && (
                 <section className="pb-16 animate-enter animate-enter-d2">
                     <div className="grid grid-cols-2 sm:grid-cols-4 gap-4">
                         <div className="glass-card text-center !p-5">
-                            <div className="text-2xl font-bold text-[--text]">{records.length}</div>
+                            <div className="text-2xl font-bold text-[--text]">{summary.total}</div>
                             <div className="text-xs text-[--text-dim] mt-1">Total Evidence</div>
                         </div>
                         <div className="glass-card text-center !p-5">
                             <div className="text-2xl font-bold text-[--success]">
-                                {records.filter((r: any) => !r.detection?.is_synthetic).length}
+                                {summary.authentic}
                             </div>
                             <div className="text-xs text-[--text-dim] mt-1">Authentic</div>
                         </div>
                         <div className="glass-card text-center !p-5">
                             <div className="text-2xl font-bold text-[--danger]">
-                                {records.filter((r: any) => r.detection?.is_synthetic).length}
+                                {summary.synthetic}
                             </div>
                             <div className="text-xs text-[--text-dim] mt-1">Flagged</div>
                         </div>
                         <div className="glass-card text-center !p-5">
                             <div className="text-2xl font-bold text-[--accent]">
-                                {records.filter((r: any) => r.sms_beacon?.status === 'ANCHORED').length}
+                                {summary.beacon_anchored}
                             </div>
                             <div className="text-xs text-[--text-dim] mt-1">Beacon Anchored</div>
                         </div>